@@ -0,0 +1,140 @@
+"""
+Batch crossword generation : solves many structures (or several distinct puzzles per
+structure) with one vocabulary, and writes every puzzle with its timing in one report.
+
+The word index of a words file is built once and cached next to it (`<words>.cache`),
+then reused by later runs as long as the words file doesn't change.
+
+Usage: python batch.py WORDS STRUCTURE [STRUCTURE ...] [-n PUZZLES] [-o REPORT]
+"""
+
+import argparse
+import json
+import os
+import pickle
+import time
+
+from crossword import Crossword, WordIndex, read_words
+from generate import CrosswordCreator
+
+# bump when WordIndex changes, so that older caches are rebuilt
+CACHE_VERSION = 2
+
+
+def load_index(words_file, cache=True):
+    """
+    Returns `(index, hit)` : the WordIndex of `words_file`, and whether it was read from the cache.
+    The cache is valid only for the same words file size and modification time.
+    """
+    path = words_file + ".cache"
+    stat = os.stat(words_file)
+    key = (CACHE_VERSION, stat.st_size, stat.st_mtime_ns)
+
+    if cache:
+        try:
+            with open(path, "rb") as f:
+                cached_key, index = pickle.load(f)
+            if cached_key == key:
+                return index, True
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError):
+            # no cache yet, or not a readable one : rebuild it
+            pass
+
+    index = WordIndex(read_words(words_file))
+    if cache:
+        with open(path, "wb") as f:
+            pickle.dump((key, index), f, protocol=pickle.HIGHEST_PROTOCOL)
+    return index, False
+
+
+def grid(creator, assignment):
+    """
+    Returns the rows of a solved crossword as strings, "#" for the blocked cells.
+    """
+    letters = creator.letter_grid(assignment)
+    crossword = creator.crossword
+    return [
+        "".join(letters[i][j] if crossword.structure[i][j] else "#" for j in range(crossword.width))
+        for i in range(crossword.height)
+    ]
+
+
+def generate(structure, index, count=1, attempts=10):
+    """
+    Solves `structure` into `count` distinct puzzles, the first one with the default orderings
+    and the next ones with random tie breaks (one seed per attempt, at most `attempts` per puzzle).
+    Returns a list of puzzle records, with the grid, seed, nodes and solve time of each.
+    """
+    crossword = Crossword(structure, None, index=index)
+    puzzles = []
+    seen = set()
+
+    for attempt in range(count * attempts):
+        seed = attempt - 1 if attempt else None
+        creator = CrosswordCreator(crossword, seed)
+        start = time.perf_counter()
+        assignment = creator.solve()
+        elapsed = time.perf_counter() - start
+
+        # no solution with the default orderings : there is none at all
+        if assignment is None:
+            break
+
+        rows = grid(creator, assignment)
+        if tuple(rows) in seen:
+            continue
+        seen.add(tuple(rows))
+        puzzles.append({
+            "structure": structure,
+            "seed": seed,
+            "nodes": creator.nodes,
+            "seconds": elapsed,
+            "grid": rows
+        })
+        if len(puzzles) == count:
+            break
+
+    return puzzles
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate many crossword puzzles with one vocabulary.")
+    parser.add_argument("words", help="words file")
+    parser.add_argument("structures", nargs="+", help="structure files")
+    parser.add_argument("-n", "--puzzles", type=int, default=1, help="distinct puzzles per structure (default 1)")
+    parser.add_argument("-o", "--output", help="write every puzzle and the timings to this JSON file")
+    parser.add_argument("--no-cache", action="store_true", help="don't read or write the word index cache")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index, hit = load_index(args.words, cache=not args.no_cache)
+    load_time = time.perf_counter() - start
+    print(f"{args.words}: {len(index.words)} words {'read from cache' if hit else 'indexed'} in {load_time:.3f} s")
+
+    report = {"words": args.words, "cache_hit": hit, "load_seconds": load_time, "structures": []}
+    for structure in args.structures:
+        start = time.perf_counter()
+        puzzles = generate(structure, index, args.puzzles)
+        elapsed = time.perf_counter() - start
+        report["structures"].append({
+            "structure": structure,
+            "requested": args.puzzles,
+            "solved": len(puzzles),
+            "seconds": elapsed,
+            "puzzles": puzzles
+        })
+
+        print(f"{structure}: {len(puzzles)}/{args.puzzles} puzzles in {elapsed:.3f} s")
+        for puzzle in puzzles:
+            print(f"    seed {puzzle['seed']}: {puzzle['nodes']} nodes, {puzzle['seconds']:.3f} s")
+            for row in puzzle["grid"]:
+                print(f"        {row}")
+
+    report["seconds"] = report["load_seconds"] + sum(result["seconds"] for result in report["structures"])
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
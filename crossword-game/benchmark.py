@@ -0,0 +1,192 @@
+"""
+Crossword solver benchmark : solves the shipped structures and synthetic grids of increasing
+size and density, with the shipped word lists and larger synthetic vocabularies, and records
+solve time, nodes, backtracks, arc revisions and peak memory of each. The report can be compared with
+the one of another solver version to find regressions.
+
+Usage: python benchmark.py [-o REPORT] [--compare OLD_REPORT] [--sizes N ...] [--densities D ...] [--timeout S]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from crossword import Crossword, WordIndex, read_words
+from generate import CrosswordCreator
+
+# letters drawn by synthetic words, about as often as in English
+LETTERS = "EEEEEEEEEEEETTTTTTTTTAAAAAAAAOOOOOOOIIIIIIINNNNNNNSSSSSSHHHHHHRRRRRRDDDDLLLLCCCUUUMMMWWFFGGYYPPBVKJXQZ"
+
+# slowdown counted as a regression, as a share of the old time
+TOLERANCE = 0.25
+
+
+class Deadline():
+
+    def __init__(self, seconds):
+        """
+        Stop condition for CrosswordCreator.solve : set once `seconds` have passed.
+        """
+        self.end = time.perf_counter() + seconds
+
+    def is_set(self):
+        return time.perf_counter() > self.end
+
+
+def synthetic_structure(size, density, seed=0):
+    """
+    Returns the lines of a `size` x `size` structure with a `density` share of blocked cells.
+    """
+    rng = random.Random(seed)
+    return [
+        "".join("#" if rng.random() < density else "_" for _ in range(size))
+        for _ in range(size)
+    ]
+
+
+def synthetic_words(count, lengths=range(2, 16), seed=0):
+    """
+    Returns a set of `count` random words, of every length in `lengths` in about equal numbers.
+    """
+    rng = random.Random(seed)
+    lengths = list(lengths)
+    words = set()
+    while len(words) < count:
+        words.add("".join(rng.choice(LETTERS) for _ in range(rng.choice(lengths))))
+    return words
+
+
+def run(structure, index, timeout):
+    """
+    Solves `structure` with the words of `index`, giving up after `timeout` seconds.
+    Returns the measures of the solve.
+    """
+    crossword = Crossword(structure, None, index=index)
+    creator = CrosswordCreator(crossword)
+    start = time.perf_counter()
+    assignment = creator.solve(stop=Deadline(timeout))
+    elapsed = time.perf_counter() - start
+    timed_out = assignment is None and elapsed > timeout
+
+    # again, traced : tracing slows the solver down too much to time it at the same time
+    traced = CrosswordCreator(crossword)
+    tracemalloc.start()
+    traced.solve(stop=Deadline(timeout))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "variables": len(crossword.variables),
+        "solved": assignment is not None,
+        "timed_out": timed_out,
+        "seconds": elapsed,
+        "nodes": creator.nodes,
+        "backtracks": creator.backtracks,
+        "revisions": creator.revisions,
+        "pruned": creator.pruned,
+        "peak_kib": peak / 1024
+    }
+
+
+def benchmark(sizes, densities, vocabularies, timeout, seed=0):
+    """
+    Runs every structure (the shipped ones, then the synthetic ones) with every vocabulary.
+    `vocabularies` maps a name to a words file or a number of synthetic words.
+    Returns the list of results, one per structure and vocabulary.
+    """
+    indexes = dict()
+    for name, source in vocabularies.items():
+        words = synthetic_words(source, seed=seed) if isinstance(source, int) else read_words(source)
+        indexes[name] = WordIndex(words)
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        structures = [os.path.join("data", f"structure{k}.txt") for k in range(3)]
+        for size in sizes:
+            for density in densities:
+                path = os.path.join(directory, f"grid{size}x{size}-{density}.txt")
+                with open(path, "w") as f:
+                    f.write("\n".join(synthetic_structure(size, density, seed)))
+                structures.append(path)
+
+        for structure in structures:
+            for name, index in indexes.items():
+                result = {"structure": os.path.basename(structure), "words": name}
+                result.update(run(structure, index, timeout))
+                results.append(result)
+                status = "solved" if result["solved"] else "timeout" if result["timed_out"] else "no solution"
+                print(f"{result['structure']:>20} {name:>12}: {status:>11} {result['seconds']:8.3f} s "
+                      f"{result['nodes']:7} nodes {result['backtracks']:7} backtracks {result['revisions']:8} revisions {result['peak_kib']:9.0f} KiB")
+    return results
+
+
+def compare(results, old, tolerance=TOLERANCE):
+    """
+    Compares `results` with the results of an `old` report, on the cases both have.
+    Prints the changes, and returns the list of regressions : cases now slower by more than
+    `tolerance` (and 10 ms), searching more nodes, or not solved anymore.
+    """
+    previous = {(result["structure"], result["words"]): result for result in old}
+    regressions = []
+    for result in results:
+        key = (result["structure"], result["words"])
+        if key not in previous:
+            continue
+        before = previous[key]
+        ratio = result["seconds"] / before["seconds"] if before["seconds"] else 1
+        print(f"{key[0]:>20} {key[1]:>12}: {before['seconds']:8.3f} s -> {result['seconds']:8.3f} s "
+              f"(x{ratio:.2f}), {before['nodes']} -> {result['nodes']} nodes, "
+              f"{before.get('backtracks', '?')} -> {result['backtracks']} backtracks")
+
+        slower = ratio > 1 + tolerance and result["seconds"] - before["seconds"] > 0.01
+        if slower or (before["solved"] and not result["solved"]) or (
+                result["solved"] and result["nodes"] > before["nodes"]):
+            regressions.append(key)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the crossword solver.")
+    parser.add_argument("-o", "--output", help="write the report to this JSON file")
+    parser.add_argument("--compare", help="report of another version to compare with")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5, 7, 9, 11, 13], help="synthetic grid sizes")
+    parser.add_argument("--densities", type=float, nargs="+", default=[0.15, 0.3],
+                        help="share of blocked cells of the synthetic grids")
+    parser.add_argument("--synthetic", type=int, nargs="+", default=[10000, 100000],
+                        help="sizes of the synthetic vocabularies")
+    parser.add_argument("--timeout", type=float, default=10, help="seconds before giving up a solve (default 10)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed of the synthetic grids and words")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help=f"slowdown counted as a regression, as a share of the old time (default {TOLERANCE})")
+    args = parser.parse_args()
+
+    vocabularies = {f"words{k}": os.path.join("data", f"words{k}.txt") for k in range(3)}
+    for count in args.synthetic:
+        vocabularies[f"synthetic{count}"] = count
+
+    start = time.perf_counter()
+    results = benchmark(args.sizes, args.densities, vocabularies, args.timeout, args.seed)
+    print(f"{len(results)} cases in {time.perf_counter() - start:.1f} s")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"python": sys.version.split()[0], "timeout": args.timeout, "results": results}, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)["results"]
+        regressions = compare(results, old, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regressions:")
+            for structure, words in regressions:
+                print(f"    {structure} with {words}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,6 @@
+import types
+
+
 class Variable():
 
     ACROSS = "across"
@@ -35,9 +38,90 @@ class Variable():
         return f"Variable({self.i}, {self.j}, {direction}, {self.length})"
 
 
+def to_bitset(ids):
+    """returns the bitset (an int) with the bits of every id in `ids` set"""
+    ids = list(ids)
+    if not ids:
+        return 0
+    # set the bits in a byte array, then convert once : or-ing big ints one bit at a time is quadratic
+    bits = bytearray(max(ids) // 8 + 1)
+    for k in ids:
+        bits[k >> 3] |= 1 << (k & 7)
+    return int.from_bytes(bits, "little")
+
+
+class WordIndex():
+
+    def __init__(self, words):
+        """
+        Indexes a vocabulary for bitset domains. Words are bucketed by length, and each word
+        gets an id within its bucket : a set of words of the same length is an int with
+        the bits of their ids set. Buckets are sorted alphabetically.
+        Also precomputes the bitset of each whole bucket, and of the words having
+        a given letter at a given position, keyed by (length, position, letter).
+        """
+        self.words = sorted(words, key=lambda word: (len(word), word))
+        self.buckets = dict()
+        for word in self.words:
+            self.buckets.setdefault(len(word), []).append(word)
+        self.ids = {word: k for bucket in self.buckets.values() for k, word in enumerate(bucket)}
+
+        # one shared int per length : every variable of that length starts with it as its domain
+        self.lengths = {length: (1 << len(bucket)) - 1 for length, bucket in self.buckets.items()}
+
+        positions = dict()
+        for length, bucket in self.buckets.items():
+            for k, word in enumerate(bucket):
+                for i, letter in enumerate(word):
+                    positions.setdefault((length, i, letter), []).append(k)
+        self.positions = {key: to_bitset(ids) for key, ids in positions.items()}
+
+        # letters of each (length, position) slot, to revise arcs letter by letter
+        self.letters = dict()
+        for length, i, letter in self.positions:
+            self.letters.setdefault((length, i), []).append(letter)
+
+    def bucket(self, length):
+        """returns the bitset of the words of `length` letters"""
+        return self.lengths.get(length, 0)
+
+    def position(self, length, i, letter):
+        """returns the bitset of the words of `length` letters with `letter` at position `i`"""
+        return self.positions.get((length, i, letter), 0)
+
+    def slot_letters(self, length, i):
+        """returns the letters found at position `i` in words of `length` letters"""
+        return self.letters.get((length, i), [])
+
+    def words_of(self, length, bits):
+        """yields the words of a bitset of words of `length` letters, in id order"""
+        bucket = self.buckets.get(length, [])
+        # the binary string read backwards has the bit of id k at index k
+        digits = bin(bits)[:1:-1]
+        k = digits.find("1")
+        while k != -1:
+            yield bucket[k]
+            k = digits.find("1", k + 1)
+
+    def bit(self, word):
+        """returns the bitset holding only `word`, among the words of its length"""
+        return 1 << self.ids[word]
+
+
+def read_words(words_file):
+    """returns the set of words of a words file, one per line, in uppercase"""
+    with open(words_file) as f:
+        return set(f.read().upper().splitlines())
+
+
 class Crossword():
 
-    def __init__(self, structure_file, words_file):
+    def __init__(self, structure_file, words_file, index=None):
+        """
+        Loads a crossword structure and the vocabulary of `words_file`.
+        An already built WordIndex of the vocabulary can be given as `index`
+        instead, so that the words file isn't read again.
+        """
 
         # get structure of crossword
         with open(structure_file) as f:
@@ -58,8 +142,12 @@ class Crossword():
                 self.structure.append(row)
 
         # save vocabulary list
-        with open(words_file) as f:
-            self.words = set(f.read().upper().splitlines())
+        if index is None:
+            self.words = read_words(words_file)
+            self.index = WordIndex(self.words)
+        else:
+            self.words = set(index.words)
+            self.index = index
 
         # get variable set
         self.variables = set()
@@ -104,30 +192,30 @@ class Crossword():
                             length=length
                         ))
 
-        # fompute overlaps for each word
-        # For any pair of variables v1, v2, their overlap is either:
-        #    none, if the two variables do not overlap; or
-        #    (i, j), where v1's ith character overlaps v2's jth character
-        self.overlaps = dict()
-        for v1 in self.variables:
-            for v2 in self.variables:
-                if v1 == v2:
-                    continue
-                cells1 = v1.cells
-                cells2 = v2.cells
-                intersection = set(cells1).intersection(cells2)
-                if not intersection:
-                    self.overlaps[v1, v2] = None
-                else:
-                    intersection = intersection.pop()
-                    self.overlaps[v1, v2] = (
-                        cells1.index(intersection),
-                        cells2.index(intersection)
-                    )
+        # compute overlaps from the variables crossing each cell :
+        # for any pair of overlapping variables v1, v2, overlaps[v1, v2] is (i, j),
+        # where v1's ith character overlaps v2's jth character.
+        # Pairs that don't overlap have no entry, overlaps.get((v1, v2)) is None for them.
+        # Built once, then read only : the mapping can't be changed afterwards
+        crossing = dict()
+        for var in self.variables:
+            for k, cell in enumerate(var.cells):
+                crossing.setdefault(cell, []).append((var, k))
+
+        overlaps = dict()
+        for slots in crossing.values():
+            for v1, k1 in slots:
+                for v2, k2 in slots:
+                    if v1 != v2:
+                        overlaps[v1, v2] = (k1, k2)
+        self.overlaps = types.MappingProxyType(overlaps)
+
+        # neighbors of each variable, computed once
+        neighbors = {var: set() for var in self.variables}
+        for v1, v2 in self.overlaps:
+            neighbors[v1].add(v2)
+        self.adjacency = {var: frozenset(adjacent) for var, adjacent in neighbors.items()}
 
     def neighbors(self, var):
-        """returns set of overlapping variables"""
-        return set(
-            v for v in self.variables
-            if v != var and self.overlaps[v, var]
-        )
+        """returns the (frozen) set of overlapping variables"""
+        return self.adjacency[var]
@@ -1,21 +1,62 @@
-import sys
+import argparse
+import heapq
+import multiprocessing
+import random
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 
 from crossword import *
 
 
+class SearchAborted(Exception):
+    """Raised by backtrack when the node limit of a restart is reached, or the search is stopped."""
+
 
 class CrosswordCreator():
 
-    def __init__(self, crossword):
+    def __init__(self, crossword, seed=None):
         """
         Initializes a new CSP crossword generator.
+        With a `seed`, ties between variables and between values are broken at random.
         """
         self.crossword = crossword
+        self.index = crossword.index
+        self.random = random.Random(seed) if seed is not None else None
+
+        # domains are bitsets over the ids of the words of the variable's length :
+        # they all start as the shared bitset of the whole length bucket
         self.domains = {
-            var: self.crossword.words.copy()
+            var: self.index.bucket(var.length)
             for var in self.crossword.variables
         }
 
+        # domains replaced while searching, as (variable, old domain), to undo them on backtrack
+        self.trail = []
+        # number of assignments tried by the last search, assignments it undid, and its restarts
+        self.nodes = 0
+        self.backtracks = 0
+        self.restarts = 0
+        # arc revisions and values they pruned
+        self.revisions = 0
+        self.pruned = 0
+        # supports of each arc, with their residues (see arc_supports)
+        self.supports = dict()
+        # node count at which backtrack gives up (see solve)
+        self.limit = None
+        self.stop = None
+
+        # unassigned variables by fewest remaining values, then highest degree (see select_unassigned_variable),
+        # then position in the grid : the variables set has no fixed order, searches would differ between runs
+        positions = sorted(self.crossword.variables, key=lambda var: (var.i, var.j, var.direction))
+        self.priority = {
+            var: (-len(self.crossword.neighbors(var)), k)
+            for k, var in enumerate(positions)
+        }
+        self.queue = []
+        if self.random is not None:
+            self.shuffle()
+
     def letter_grid(self, assignment):
         """
         returns 2D array representing a given assignment.
@@ -36,80 +77,85 @@ class CrosswordCreator():
         """
         print crossword assignment to the terminal.
         """
-        letters = self.letter_grid(assignment)
-        for i in range(self.crossword.height):
-            for j in range(self.crossword.width):
-                if self.crossword.structure[i][j]:
-                    print(letters[i][j] or " ", end="")
-                else:
-                    print("█", end="")
-            print()
+        print_grid(self.crossword.structure, self.letter_grid(assignment))
 
     def save(self, assignment, filename):
         """
         save crossword assignment to an image file.
         """
-        from PIL import Image, ImageDraw, ImageFont
-        cell_size = 100
-        cell_border = 2
-        interior_size = cell_size - 2 * cell_border
-        letters = self.letter_grid(assignment)
-
-        # Create a blank canvas
-        img = Image.new(
-            "RGBA",
-            (self.crossword.width * cell_size,
-             self.crossword.height * cell_size),
-            "black"
-        )
-        font = ImageFont.truetype("assets/fonts/OpenSans-Regular.ttf", 80)
-        draw = ImageDraw.Draw(img)
-
-        for i in range(self.crossword.height):
-            for j in range(self.crossword.width):
-
-                rect = [
-                    (j * cell_size + cell_border,
-                     i * cell_size + cell_border),
-                    ((j + 1) * cell_size - cell_border,
-                     (i + 1) * cell_size - cell_border)
-                ]
-                if self.crossword.structure[i][j]:
-                    draw.rectangle(rect, fill="white")
-                    if letters[i][j]:
-                        w, h = draw.textsize(letters[i][j], font=font)
-                        draw.text(
-                            (rect[0][0] + ((interior_size - w) / 2),
-                             rect[0][1] + ((interior_size - h) / 2) - 10),
-                            letters[i][j], fill="black", font=font
-                        )
-
-        img.save(filename)
-
-    def solve(self):
+        save_grid(self.crossword.structure, self.letter_grid(assignment), filename)
+
+    def solve(self, restart=None, growth=1.5, stop=None):
+        """
+        Returns a complete assignment, or None if there is none.
+        With `restart`, the search starts over with new random tie breaks once it has
+        tried `restart` values, the limit growing by `growth` on every restart.
+        Also returns None as soon as the `stop` event is set.
+        """
+        self.nodes = 0
+        self.backtracks = 0
+        self.restarts = 0
+        self.revisions = 0
+        self.pruned = 0
+        self.stop = stop
         self.enforce_node_consistency()
-        self.ac3()
-        return self.backtrack(dict())
+        # a slot no word fits in, or a domain emptied by arc consistency, means there is no solution
+        if any(domain == 0 for domain in self.domains.values()) or not self.ac3():
+            return None
+
+        domains = self.domains.copy()
+        while True:
+            self.domains = domains.copy()
+            self.trail = []
+            self.reset_queue()
+            self.limit = self.nodes + restart if restart is not None else None
+            try:
+                return self.backtrack(dict())
+            except SearchAborted:
+                if stop is not None and stop.is_set():
+                    return None
+                self.restarts += 1
+                restart = int(restart * growth)
+                if self.random is None:
+                    self.random = random.Random()
+                self.shuffle()
+
+    def shuffle(self):
+        """
+        Draw new random tie breaks between variables of the same domain size and degree.
+        """
+        variables = list(self.crossword.variables)
+        self.random.shuffle(variables)
+        for k, var in enumerate(variables):
+            self.priority[var] = (self.priority[var][0], k)
+
+    def set_domain(self, var, domain):
+        """
+        Replace the domain of `var`, keeping the old one on the trail.
+        """
+        self.trail.append((var, self.domains[var]))
+        self.domains[var] = domain
+        self.push(var)
+
+    def undo(self, mark):
+        """
+        Restore the domains changed since the trail had `mark` entries.
+        """
+        while len(self.trail) > mark:
+            var, domain = self.trail.pop()
+            self.domains[var] = domain
+            self.push(var)
 
     def enforce_node_consistency(self):
         """
         ensure that each variable is node-consistent by removing any values (words) that do not satisfy the variable's
         unary constraints, specifically ensuring that the word length matches the required length for the variable
         """
-        wordsToRemove = list()
-        for var in self.domains:
-            for word in self.domains[var]:
-                count = 0
-                if (len(word) != var.length): 
-                    count += 1
-                if count == len(self.domains[var]):
-                    wordsToRemove.append(word)
-        
         for var in self.domains:
-            for w in wordsToRemove:
-                if w in self.domains[var]:
-                    self.domains[var].remove(w)
-                
+            bucket = self.index.bucket(var.length)
+            # domains still holding the whole bucket keep sharing it instead of a copy
+            if self.domains[var] is not bucket:
+                self.domains[var] &= bucket
 
     def revise(self, x, y):
         """
@@ -120,30 +166,46 @@ class CrosswordCreator():
         Return True if a revision was made to the domain of `x`; return
         False if no revision was made.
         """
-        revised = False
-        
-        i, j = self.crossword.overlaps[x, y]
-
-        wordsToRemove = list()
-        
-        for w1 in self.domains[x]:
-            # we start with 0 possibility since we havent tested anything yet
-            count = 0
-            for w2 in self.domains[y]:
-                # if a value if possible, add to the count / first line : verify its not out of range
-                if i < len(w1) and j < len(w2):
-                    if w1[i] == w2[j]:
-                        count += 1
-            
-            # if no possibility, remove the value from the variable domain
-            if count == 0:
-                wordsToRemove.append(w1)
-                revised = True
-
-        for w in wordsToRemove:
-            self.domains[x].remove(w)  
+        self.revisions += 1
+        supports = self.supports.get((x, y))
+        if supports is None:
+            supports = self.arc_supports(x, y)
+
+        # letters y can still put on the shared cell, and the words of x that agree with one of them
+        domain = self.domains[y]
+        supported = 0
+        for support in supports:
+            y_words, x_words, residue = support
+            # the word of y that supported the letter last time most often still does
+            if domain & residue:
+                supported |= x_words
+                continue
+            found = domain & y_words
+            if found:
+                support[2] = found & -found
+                supported |= x_words
+
+        revised = self.domains[x] & supported
+        if revised == self.domains[x]:
+            return False
+        self.pruned += self.domains[x].bit_count() - revised.bit_count()
+        self.set_domain(x, revised)
+        return True
 
-        return revised
+    def arc_supports(self, x, y):
+        """
+        Returns the supports of the arc (x, y), one per letter both can put on their shared cell :
+        [words of y with the letter, words of x with the letter, residue], where the residue
+        is the bit of the last word of y found with the letter (0 until one is found).
+        """
+        i, j = self.crossword.overlaps[x, y]
+        supports = []
+        for letter in self.index.slot_letters(y.length, j):
+            x_words = self.index.position(x.length, i, letter)
+            if x_words:
+                supports.append([self.index.position(y.length, j, letter), x_words, 0])
+        self.supports[x, y] = supports
+        return supports
 
     def ac3(self, arcs=None):
         """
@@ -151,18 +213,30 @@ class CrosswordCreator():
         returns False if one or more domains end up empty.
         """
         if arcs == None:
-            arcs = list()
-            for x in self.crossword.variables:
-                for y in self.crossword.neighbors(x):
-                    arcs.append((x, y))
-        
-        while arcs:
-            x, y = arcs.pop()
+            arcs = [
+                (x, y)
+                for x in self.crossword.variables
+                for y in self.crossword.neighbors(x)
+            ]
+
+        # first in first out, and an arc already waiting is never queued twice
+        queue = deque()
+        queued = set()
+        for arc in arcs:
+            if arc not in queued:
+                queue.append(arc)
+                queued.add(arc)
+
+        while queue:
+            x, y = queue.popleft()
+            queued.remove((x, y))
             if self.revise(x, y):
-                if len(self.domains[x]) == 0:
+                if self.domains[x] == 0:
                     return False
-                for z in self.crossword.neighbors(x) - self.domains[y]:
-                    arcs.append((z, x))
+                for z in self.crossword.neighbors(x):
+                    if z != y and (z, x) not in queued:
+                        queue.append((z, x))
+                        queued.add((z, x))
         return True
 
     def assignment_complete(self, assignment):
@@ -206,30 +280,28 @@ class CrosswordCreator():
         The first value in the list, for example, should be the one
         that rules out the fewest values among the neighbors of `var`.
         """
-        choices = dict()
-        for value in self.domains[var]:
-            count = 0
-            for n in self.crossword.neighbors(var):
-                if n in assignment:
-                    continue
-                
-                for v in self.domains[n]:
-                     # if theres an overlaps check if the words can fit or if it clashes
-                    if self.crosswords.overlaps[var, n]:
-                        i, j = self.crosswords.overlaps[var, n]
-                        if assignment[var][i] != v[j]:
-                            count += 1
-                    elif value == v:
-                        count += 1
-                    elif len(v) != n.length:
-                        count += 1
-                
-                # count if it rules out the neighbor ? 
-            # then select the number of variable it rules out and add it to choice
-            choices[value]= count
-            
-        sortedDict = sorted(choices.items(), key = lambda item: item[1])
-        return list(sortedDict.keys())
+        # a word rules out the words of a neighbor without its letter on the shared cell,
+        # so count once per neighbor how many of its words each letter leaves
+        supports = []
+        for n in self.crossword.neighbors(var):
+            if n in assignment:
+                continue
+            i, j = self.crossword.overlaps[var, n]
+            domain = self.domains[n]
+            left = {
+                letter: (domain & self.index.position(n.length, j, letter)).bit_count()
+                for letter in self.index.slot_letters(var.length, i)
+            }
+            supports.append((i, domain.bit_count(), left))
+
+        def ruled_out(word):
+            return sum(size - left.get(word[i], 0) for i, size, left in supports)
+
+        words = list(self.index.words_of(var.length, self.domains[var]))
+        if self.random is not None:
+            # sorting is stable : shuffling first breaks ties at random
+            self.random.shuffle(words)
+        return sorted(words, key=ruled_out)
 
     def select_unassigned_variable(self, assignment):
         """
@@ -237,19 +309,39 @@ class CrosswordCreator():
         remaining values in its domain. In case of a tie, it chooses the variable with the highest degree;
         if there's still a tie, any of the tied variables can be returned
         """
-        vardict = dict()
-        for var in self.crossword.variables:
-            if var in assignment:
-                continue
-            else:
-                vardict[var] = len(self.domains[var])
-                #return var
-        
-        sortedByMin = sorted(vardict.items(), key = lambda item: item[1])      
-        
-        sortedByHeuristic = sorted(sortedByMin, key = lambda item: len(self.crossword.neighbors(item[0])))
-        return sortedByHeuristic[0][0]
-        
+        # entries of the queue are pushed on every domain change and never updated :
+        # skip the ones of assigned variables or of a domain size that changed since
+        while self.queue:
+            size, _, _, var = self.queue[0]
+            if var not in assignment and size == self.domains[var].bit_count():
+                return var
+            heapq.heappop(self.queue)
+
+        # only when the queue wasn't built yet
+        self.reset_queue()
+        if len(self.queue) == len(assignment):
+            return None
+        return self.select_unassigned_variable(assignment)
+
+    def push(self, var):
+        """
+        Add `var` to the variable queue with its current domain size.
+        Rebuilds the queue instead when it holds too many outdated entries.
+        """
+        if len(self.queue) > 8 * len(self.priority):
+            self.reset_queue()
+        else:
+            heapq.heappush(self.queue, (self.domains[var].bit_count(),) + self.priority[var] + (var,))
+
+    def reset_queue(self):
+        """
+        Build the variable queue, a heap of (domain size, -degree, tie breaker, variable) entries.
+        """
+        self.queue = [
+            (self.domains[var].bit_count(),) + self.priority[var] + (var,)
+            for var in self.crossword.variables
+        ]
+        heapq.heapify(self.queue)
 
     def backtrack(self, assignment):
         """
@@ -261,38 +353,223 @@ class CrosswordCreator():
             return assignment
 
         var = self.select_unassigned_variable(assignment)
-        for word in self.domains[var]:
-            new_assignment = assignment.copy()
-            new_assignment[var] = word
-            if self.consistent(new_assignment):
-                result = self.backtrack(new_assignment)
+        for word in self.order_domain_values(var, assignment):
+            self.nodes += 1
+            if self.limit is not None and self.nodes > self.limit:
+                raise SearchAborted
+            if self.stop is not None and self.stop.is_set():
+                raise SearchAborted
+            if not self.consistent_value(var, word, assignment):
+                continue
+
+            # assign in place and maintain arc consistency around var, undoing it all on failure
+            mark = len(self.trail)
+            assignment[var] = word
+            if self.assign(var, word, assignment):
+                result = self.backtrack(assignment)
                 if result is not None:
                     return result
+            del assignment[var]
+            self.undo(mark)
+            self.backtracks += 1
         return None
 
+    def consistent_value(self, var, word, assignment):
+        """
+        Return True if `word` can be assigned to `var` given a consistent `assignment` :
+        only the new word is checked, against the words already assigned.
+        """
+        if var.length != len(word):
+            return False
+        for n in self.crossword.neighbors(var):
+            if n in assignment:
+                i, j = self.crossword.overlaps[var, n]
+                if word[i] != assignment[n][j]:
+                    return False
+        return word not in assignment.values()
+
+    def assign(self, var, word, assignment):
+        """
+        Reduce the domain of `var` to `word`, remove `word` from the domains of the other
+        unassigned variables, and enforce arc consistency on the arcs toward the changed domains.
+        Returns False if a domain ends up empty. Every change goes on the trail.
+        """
+        bit = self.index.bit(word)
+        self.set_domain(var, bit)
+        changed = [var]
+
+        # words are distinct : only variables of the same length can hold this one
+        for other in self.crossword.variables:
+            if other.length != var.length or other == var or other in assignment:
+                continue
+            if self.domains[other] & bit:
+                self.set_domain(other, self.domains[other] & ~bit)
+                if self.domains[other] == 0:
+                    return False
+                changed.append(other)
+
+        arcs = [
+            (n, y)
+            for y in changed
+            for n in self.crossword.neighbors(y)
+            if n not in assignment
+        ]
+        return self.ac3(arcs)
+
+
+# set in each worker process of a portfolio, to stop every search once one is solved
+stop_event = None
 
-def main():
 
-    if len(sys.argv) not in [3, 4]:
-        sys.exit("Wrong arguments count")
+def print_grid(structure, letters):
+    """
+    print a grid of letters (see CrosswordCreator.letter_grid) to the terminal.
+    """
+    for i in range(len(structure)):
+        for j in range(len(structure[i])):
+            if structure[i][j]:
+                print(letters[i][j] or " ", end="")
+            else:
+                print("█", end="")
+        print()
+
+
+def save_grid(structure, letters, filename):
+    """
+    save a grid of letters (see CrosswordCreator.letter_grid) to an image file.
+    """
+    from PIL import Image, ImageDraw, ImageFont
+    height, width = len(structure), len(structure[0])
+    cell_size = 100
+    cell_border = 2
+    interior_size = cell_size - 2 * cell_border
+
+    # Create a blank canvas
+    img = Image.new(
+        "RGBA",
+        (width * cell_size,
+         height * cell_size),
+        "black"
+    )
+    font = ImageFont.truetype("assets/fonts/OpenSans-Regular.ttf", 80)
+    draw = ImageDraw.Draw(img)
+
+    for i in range(height):
+        for j in range(width):
+
+            rect = [
+                (j * cell_size + cell_border,
+                 i * cell_size + cell_border),
+                ((j + 1) * cell_size - cell_border,
+                 (i + 1) * cell_size - cell_border)
+            ]
+            if structure[i][j]:
+                draw.rectangle(rect, fill="white")
+                if letters[i][j]:
+                    w, h = draw.textsize(letters[i][j], font=font)
+                    draw.text(
+                        (rect[0][0] + ((interior_size - w) / 2),
+                         rect[0][1] + ((interior_size - h) / 2) - 10),
+                        letters[i][j], fill="black", font=font
+                    )
+
+    img.save(filename)
+
+
+def init_worker(stop):
+    global stop_event
+    stop_event = stop
+
+
+def portfolio_worker(structure, words, seed, restart):
+    """
+    Runs in a worker process : solves the crossword with its own seed and restart strategy.
+    Returns a dict with the seed, the assignment (None if stopped or unsolvable), the structure
+    and letter grid of the crossword to print the assignment from (see print_grid),
+    whether the search was stopped, and its node and restart counts.
+    """
+    start = time.perf_counter()
+    creator = CrosswordCreator(Crossword(structure, words), seed)
+    assignment = creator.solve(restart=restart, stop=stop_event)
+    return {
+        "seed": seed,
+        "restart": restart,
+        "assignment": assignment,
+        "structure": creator.crossword.structure,
+        "letters": creator.letter_grid(assignment) if assignment is not None else None,
+        "stopped": stop_event.is_set() and assignment is None,
+        "nodes": creator.nodes,
+        "restarts": creator.restarts,
+        "revisions": creator.revisions,
+        "seconds": time.perf_counter() - start
+    }
+
+
+def solve_portfolio(structure, words, workers, seed=0, restart=200):
+    """
+    Solves the crossword with `workers` searches at once : the first one with the default
+    orderings and no restarts, the others with random tie breaks (seeds `seed`, `seed` + 1, ...)
+    and restarts after `restart` values. Once one search is over, the others are stopped.
+    Returns the results of every worker (see portfolio_worker), the first finished first.
+    """
+    stop = multiprocessing.Event()
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(stop,)) as executor:
+        pending = {executor.submit(portfolio_worker, structure, words, None, None)}
+        for k in range(1, workers):
+            pending.add(executor.submit(portfolio_worker, structure, words, seed + k - 1, restart))
+
+        results = []
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                results.append(future.result())
+            # a search that didn't stop is a solution, or the proof there is none
+            if any(not result["stopped"] for result in results):
+                stop.set()
+    return results
+
 
-    # parse command-line arguments
-    structure = sys.argv[1]
-    words = sys.argv[2]
-    output = sys.argv[3] if len(sys.argv) == 4 else None
+def main():
+    parser = argparse.ArgumentParser(description="Generate a crossword puzzle.")
+    parser.add_argument("structure", help="structure file")
+    parser.add_argument("words", help="words file")
+    parser.add_argument("output", nargs="?", help="image file to save the crossword to")
+    parser.add_argument("-w", "--workers", type=int, default=1,
+                        help="searches to run in parallel with different orderings (default 1)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed of the parallel searches")
+    parser.add_argument("--restart", type=int, default=200,
+                        help="values tried before the first restart of the parallel searches (default 200)")
+    args = parser.parse_args()
 
     # generate crossword
-    crossword = Crossword(structure, words)
-    creator = CrosswordCreator(crossword)
-    assignment = creator.solve()
+    if args.workers > 1:
+        start = time.perf_counter()
+        results = solve_portfolio(args.structure, args.words, args.workers, args.seed, args.restart)
+        structure, letters = results[0]["structure"], results[0]["letters"]
+        elapsed = time.perf_counter() - start
+        print(f"{args.structure}: {elapsed:.3f} s with {args.workers} workers")
+        for result in results:
+            status = "stopped" if result["stopped"] else "solved" if result["assignment"] else "no solution"
+            print(f"    seed {result['seed']}: {result['nodes']} nodes, {result['restarts']} restarts, "
+                  f"{result['revisions']} revisions, "
+                  f"{result['seconds']:.3f} s, {status}")
+    else:
+        creator = CrosswordCreator(Crossword(args.structure, args.words))
+        start = time.perf_counter()
+        assignment = creator.solve()
+        structure = creator.crossword.structure
+        letters = creator.letter_grid(assignment) if assignment is not None else None
+        elapsed = time.perf_counter() - start
+        print(f"{args.structure}: {creator.nodes} nodes, {creator.revisions} revisions "
+              f"({creator.pruned} values pruned) in {elapsed:.3f} s")
 
     # print result
-    if assignment is None:
+    if letters is None:
         print("No solution found")
     else:
-        creator.print(assignment)
-        if output:
-            creator.save(assignment, output)
+        print_grid(structure, letters)
+        if args.output:
+            save_grid(structure, letters, args.output)
 
 
 if __name__ == "__main__":
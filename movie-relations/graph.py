@@ -0,0 +1,157 @@
+"""
+Compact graph of who starred in which movie, for degrees of separation searches.
+
+People and movies get dense integer indices, and the bipartite star graph is stored in
+compressed sparse row form with NumPy : the movies of person p are
+`person_movies[person_offsets[p]:person_offsets[p + 1]]`, and the people of movie m are
+`movie_people[movie_offsets[m]:movie_offsets[m + 1]]`.
+"""
+
+import numpy as np
+
+
+def csr(rows, columns, count):
+    """
+    Returns `(offsets, indices)` : the CSR adjacency of `count` rows given as two arrays
+    of (row, column) pairs, with the columns of each row sorted.
+    """
+    order = np.lexsort((columns, rows))
+    offsets = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=count), out=offsets[1:])
+    return offsets, columns[order]
+
+
+def expand(offsets, indices, nodes):
+    """
+    Returns `(positions, neighbors)` : every neighbor of the `nodes` in a CSR adjacency,
+    and for each one the position in `nodes` of the node it is a neighbor of.
+    """
+    starts = offsets[nodes]
+    counts = offsets[nodes + 1] - starts
+    positions = np.repeat(np.arange(len(nodes)), counts)
+    # index of each neighbor in `indices` : the start of its row, plus its rank in the row
+    ranks = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return positions, indices[starts[positions] + ranks]
+
+
+class Graph():
+
+    def __init__(self, person_ids, movie_ids, stars):
+        """
+        Builds the graph of the people `person_ids` and the movies `movie_ids` (lists of ids,
+        whose positions become the indices), where `stars` is a list of (person_id, movie_id)
+        pairs. Pairs with an unknown id are skipped, and repeated pairs are only counted once.
+        """
+        self.person_ids = person_ids
+        self.movie_ids = movie_ids
+        self.person_index = {person_id: k for k, person_id in enumerate(person_ids)}
+        self.movie_index = {movie_id: k for k, movie_id in enumerate(movie_ids)}
+
+        indices = []
+        for person_id, movie_id in stars:
+            try:
+                indices.append((self.person_index[person_id], self.movie_index[movie_id]))
+            except KeyError:
+                pass
+
+        # one int64 key per pair, to drop the repeated ones
+        pairs = np.array(indices, dtype=np.int64).reshape(-1, 2)
+        keys = np.unique(pairs[:, 0] * len(movie_ids) + pairs[:, 1])
+        people = (keys // max(len(movie_ids), 1)).astype(np.int32)
+        movies = (keys % max(len(movie_ids), 1)).astype(np.int32)
+
+        self.person_offsets, self.person_movies = csr(people, movies, len(person_ids))
+        self.movie_offsets, self.movie_people = csr(movies, people, len(movie_ids))
+
+    def nbytes(self):
+        """
+        Returns the memory used by the adjacency arrays, in bytes.
+        """
+        return (self.person_offsets.nbytes + self.person_movies.nbytes
+                + self.movie_offsets.nbytes + self.movie_people.nbytes)
+
+    def movies_of(self, person):
+        """
+        Returns the array of the movie indices of the person index `person`.
+        """
+        return self.person_movies[self.person_offsets[person]:self.person_offsets[person + 1]]
+
+    def people_of(self, movie):
+        """
+        Returns the array of the person indices of the movie index `movie`.
+        """
+        return self.movie_people[self.movie_offsets[movie]:self.movie_offsets[movie + 1]]
+
+    def neighbors(self, people):
+        """
+        Returns `(positions, movies, costars)` : for the array of person indices `people`, every
+        movie one of them starred in and every person who starred in it (themselves included),
+        with the position in `people` of the person each pair is a neighbor of.
+        """
+        positions, movies = expand(self.person_offsets, self.person_movies, people)
+        through, costars = expand(self.movie_offsets, self.movie_people, movies)
+        return positions[through], movies[through], costars
+
+    def shortest_path(self, source, target):
+        """
+        Returns the shortest list of (movie index, person index) pairs connecting the
+        person indices `source` and `target`, or None if they aren't connected.
+        Searches from both ends at once, expanding the smaller frontier a whole layer at a time.
+        """
+        if source == target:
+            return []
+
+        # for each side, the depth of every person reached (-1 if not),
+        # and the person and movie each one was reached from
+        count = len(self.person_ids)
+        depth = [np.full(count, -1, dtype=np.int32) for _ in range(2)]
+        parent = [np.full(count, -1, dtype=np.int32) for _ in range(2)]
+        movie = [np.full(count, -1, dtype=np.int32) for _ in range(2)]
+        layers = [np.array([source], dtype=np.int32), np.array([target], dtype=np.int32)]
+        levels = [0, 0]
+        depth[0][source] = depth[1][target] = 0
+
+        while len(layers[0]) and len(layers[1]):
+            side = 0 if len(layers[0]) <= len(layers[1]) else 1
+            other = 1 - side
+            positions, movies, costars = self.neighbors(layers[side])
+            origins = layers[side][positions]
+
+            # the searches meet : keep the link closest to the other end
+            met = np.flatnonzero(depth[other][costars] >= 0)
+            if len(met):
+                k = met[np.argmin(depth[other][costars[met]])]
+                links = ((origins[k], movies[k], costars[k]) if side == 0
+                         else (costars[k], movies[k], origins[k]))
+                return self.join(parent, movie, *links)
+
+            # people reached for the first time, each from the first pair that reaches them
+            new = depth[side][costars] < 0
+            people, first = np.unique(costars[new], return_index=True)
+            levels[side] += 1
+            depth[side][people] = levels[side]
+            parent[side][people] = origins[new][first]
+            movie[side][people] = movies[new][first]
+            layers[side] = people.astype(np.int32)
+
+        return None
+
+    def join(self, parent, movie, forward, action, backward):
+        """
+        Returns the path of (movie index, person index) pairs from the source to the target,
+        given the person `forward` reached from the source, the person `backward` reached
+        from the target, and the movie `action` both starred in.
+        """
+        links = []
+        person = forward
+        while parent[0][person] >= 0:
+            links.append((int(movie[0][person]), int(person)))
+            person = parent[0][person]
+        links.reverse()
+
+        links.append((int(action), int(backward)))
+        person = backward
+        while parent[1][person] >= 0:
+            links.append((int(movie[1][person]), int(parent[1][person])))
+            person = parent[1][person]
+        return links
@@ -1,19 +1,23 @@
 import csv
 import sys
 
-from util import Node, StackFrontier, QueueFrontier
+from graph import Graph
 
 # maps names to a set of corresponding person_ids
 names = {}
 
-# maps person_ids to a dictionary of: name, birth, movies (a set of movie_ids)
+# maps person_ids to a dictionary of: name, birth
 people = {}
 
-# maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
+# maps movie_ids to a dictionary of: title, year
 movies = {}
 
+# who starred in which movie (see graph.Graph), built by load_data
+graph = None
+
 
 def load_data(directory):
+    global graph
 
     # load people into memory
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
@@ -21,8 +25,7 @@ def load_data(directory):
         for row in reader:
             people[row["id"]] = {
                 "name": row["name"],
-                "birth": row["birth"],
-                "movies": set()
+                "birth": row["birth"]
             }
             if row["name"].lower() not in names:
                 names[row["name"].lower()] = {row["id"]}
@@ -35,19 +38,14 @@ def load_data(directory):
         for row in reader:
             movies[row["id"]] = {
                 "title": row["title"],
-                "year": row["year"],
-                "stars": set()
+                "year": row["year"]
             }
 
-    # load stars into memory
+    # load stars into memory, as the graph of people and movies
     with open(f"{directory}/stars.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
-            except KeyError:
-                pass
+        stars = [(row["person_id"], row["movie_id"]) for row in reader]
+    graph = Graph(list(people), list(movies), stars)
 
 
 def main():
@@ -86,52 +84,10 @@ def shortest_path(source, target):
     """
     Returns the shortest list of (movie_id, person_id) pairs that connect the source to the target or None if no possible path.
     """
-
-    # initialize frontier to just the starting position
-    start = Node(state=source, parent=None, action=None)
-    frontier = QueueFrontier()
-    frontier.add(start)
-
-    # initialize an empty explored set
-    explored = set()
-
-    # keep looping until solution found
-    while True:
-        # if nothing left in frontier, then no path
-        if frontier.empty():
-            raise Exception("no solution")
-            
-        else:
-            # choose a node from the frontier
-            node = frontier.remove()
-
-            # if node is goal  (I leave it in case source == target somehow, but normally, since I check for the target when I add children, I don't need to.)
-            if node.state == target:
-                links= []
-                while node.parent is not None:
-                    links.append((node.action, node.state))
-                    node = node.parent
-                links.reverse()
-                solution = links
-                return solution
-            
-            # mark node as explored
-            explored.add(node.state)
-
-            # add neighbors to frontier (and if a neighbor is the solution, dont bother keep going)
-            for action, state in neighbors_for_person(node.state):
-                if not frontier.contains_state(state) and state not in explored:
-                    child = Node(state=state, parent=node, action=action)
-                    if child.state == target:
-                        links= []
-                        while child.parent is not None:
-                            links.append((child.action, child.state))
-                            child = child.parent
-                        links.reverse()
-                        solution = links
-                        return solution
-                    frontier.add(child)
-
+    path = graph.shortest_path(graph.person_index[source], graph.person_index[target])
+    if path is None:
+        return None
+    return [(graph.movie_ids[movie], graph.person_ids[person]) for movie, person in path]
 
 
 def person_id_for_name(name):
@@ -163,11 +119,10 @@ def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people who starred with a given person.
     """
-    movie_ids = people[person_id]["movies"]
     neighbors = set()
-    for movie_id in movie_ids:
-        for person_id in movies[movie_id]["stars"]:
-            neighbors.add((movie_id, person_id))
+    for movie in graph.movies_of(graph.person_index[person_id]).tolist():
+        for costar in graph.people_of(movie).tolist():
+            neighbors.add((graph.movie_ids[movie], graph.person_ids[costar]))
     return neighbors
 
 
@@ -1,3 +1,10 @@
+from collections import deque
+
+# node and frontier helpers for generic searches over (state, parent, action) nodes.
+# relations.py doesn't use them : its degrees of separation search runs on the
+# arrays of graph.Graph, a whole layer at a time
+
+
 class Node():
     def __init__(self, state, parent, action):
         self.state = state
@@ -7,24 +14,33 @@ class Node():
 
 class StackFrontier():
     def __init__(self):
-        self.frontier = []
+        self.frontier = deque()
+        # number of nodes of each state in the frontier, for constant time contains_state
+        self.states = dict()
 
     def add(self, node):
         self.frontier.append(node)
+        self.states[node.state] = self.states.get(node.state, 0) + 1
 
     def contains_state(self, state):
-        return any(node.state == state for node in self.frontier)
+        return state in self.states
 
     def empty(self):
         return len(self.frontier) == 0
 
+    def take(self, node):
+        # forget the state of a node leaving the frontier
+        if self.states[node.state] == 1:
+            del self.states[node.state]
+        else:
+            self.states[node.state] -= 1
+        return node
+
     def remove(self):
         if self.empty():
             raise Exception("empty frontier")
         else:
-            node = self.frontier[-1]
-            self.frontier = self.frontier[:-1]
-            return node
+            return self.take(self.frontier.pop())
 
 
 class QueueFrontier(StackFrontier):
@@ -33,6 +49,4 @@ class QueueFrontier(StackFrontier):
         if self.empty():
             raise Exception("empty frontier")
         else:
-            node = self.frontier[0]
-            self.frontier = self.frontier[1:]
-            return node
+            return self.take(self.frontier.popleft())
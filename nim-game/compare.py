@@ -0,0 +1,55 @@
+"""
+Compares the raw and canonical (see NimAI.key) Q-table representations of NimAI :
+Q-table size and training speed for a few pile configurations.
+
+Usage: python compare.py [games] [piles...]
+"""
+
+import itertools
+import math
+import sys
+import time
+
+from nim import NimAI, train
+
+
+def measure(initial, games, canonical):
+    """
+    Train a NimAI for `games` games, returns `(ai, games per second)`.
+    """
+    ai = NimAI(initial=initial, canonical=canonical)
+    start = time.perf_counter()
+    train(games, ai, verbose=False)
+    return ai, games / (time.perf_counter() - start)
+
+
+def state_counts(initial):
+    """
+    Returns how many states the game has, raw and canonical (distinct sorted piles).
+    """
+    raw = math.prod(pile + 1 for pile in initial)
+    canonical = len(set(
+        tuple(sorted(piles)) for piles in itertools.product(*[range(pile + 1) for pile in initial])
+    ))
+    return raw, canonical
+
+
+def main():
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    configurations = [[1, 3, 5, 7], [3, 3, 5, 5, 7, 7], [10, 20, 30, 40]]
+    if len(sys.argv) > 2:
+        configurations = [[int(pile) for pile in sys.argv[2:]]]
+
+    for initial in configurations:
+        raw, raw_speed = measure(initial, games, False)
+        canonical, canonical_speed = measure(initial, games, True)
+        raw_states, canonical_states = state_counts(initial)
+        print(f"Piles {initial}: {raw_states} states, {canonical_states} canonical states "
+              f"({raw_states / canonical_states:.1f}x fewer). After {games} training games:")
+        print(f"    raw:       {len(raw.q)} Q-values, {raw_speed:.0f} games/s")
+        print(f"    canonical: {len(canonical.q)} Q-values ({len(raw.q) / len(canonical.q):.1f}x smaller), "
+              f"{canonical_speed:.0f} games/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,18 @@
 import math
+import mmap
+import multiprocessing
+import os
 import random
+import struct
+import sys
 import time
+from array import array
+
+# binary Q-table files (see NimAI.save)
+QFILE_MAGIC = b"NIMQ"
+QFILE_VERSION = 2
+# record count of a dense Q-table file
+QFILE_DENSE = 2 ** 64 - 1
 
 
 class Nim():
@@ -72,19 +84,70 @@ class Nim():
 
 class NimAI():
 
-    def __init__(self, alpha=0.5, epsilon=0.1):
+    def __init__(self, alpha=0.5, epsilon=0.1, initial=[1, 3, 5, 7], canonical=False):
         """
         Initialize AI with an empty Q-learning dictionary,
-        an alpha (learning) rate, and an epsilon rate.
+        an alpha (learning) rate, an epsilon rate, and the
+        `initial` piles of the games it plays.
 
         The Q-learning dictionary maps `(state, action)`
         pairs to a Q-value (a number).
          - `state` is a tuple of remaining piles, e.g. (1, 1, 4, 4)
          - `action` is a tuple `(i, j)` for an action
+
+        If `canonical` is True, states that are the same piles in another
+        order share their Q-values (see `key`), which makes the dictionary
+        a lot smaller for games with many piles.
         """
         self.q = dict()
         self.alpha = alpha
         self.epsilon = epsilon
+        self.initial = list(initial)
+        self.canonical = canonical
+
+        # state and result of the last keyed_actions call : during training the same state
+        # is asked for by update (best future reward) and then by choose_action
+        self.keyed = (None, None)
+
+    def key(self, state, action):
+        """
+        Return the key of the state `state` and the action `action` in `self.q`.
+
+        Canonical keys use the sorted piles as state, and `(size, j)` as action
+        (removing `j` items from a pile of `size` items) : the order of the
+        piles doesn't matter to the game, and neither does which of two
+        piles of the same size an action takes from.
+        """
+        if not self.canonical:
+            return (tuple(state), action)
+        i, j = action
+        return (tuple(sorted(state)), (state[i], j))
+
+    def keyed_actions(self, state):
+        """
+        Return the `(action, key)` pairs of the available actions in `state`
+        that need to be considered : every action, or with canonical keys one
+        action per distinct pile size. The state is only sorted once.
+        """
+        state = tuple(state)
+        if self.keyed[0] == state:
+            return self.keyed[1]
+
+        if not self.canonical:
+            pairs = [(action, (state, action)) for action in Nim.available_actions(state)]
+        else:
+            ordered = tuple(sorted(state))
+            pairs = []
+            seen = set()
+            for i, pile in enumerate(state):
+                if pile in seen:
+                    continue
+                seen.add(pile)
+                for j in range(1, pile + 1):
+                    pairs.append(((i, j), (ordered, (pile, j))))
+
+        self.keyed = (state, pairs)
+        return pairs
 
     def update(self, old_state, action, new_state, reward):
         """
@@ -92,16 +155,18 @@ class NimAI():
         in that state, a new resulting state, and the reward received
         from taking that action.
         """
-        old = self.get_q_value(old_state, action)
+        # the key is computed once, for both the read and the write
+        key = self.key(old_state, action)
+        old = self.q.get(key, 0)
         best_future = self.best_future_reward(new_state)
-        self.update_q_value(old_state, action, old, reward, best_future)
+        self.q[key] = old + self.alpha * ((reward + best_future) - old)
 
     def get_q_value(self, state, action):
         """
         Return the Q-value for the state `state` and the action `action`.
         If no Q-value exists yet in `self.q`, return 0.
         """
-        q = self.q.get((tuple(state), action), 0)
+        q = self.q.get(self.key(state, action), 0)
         return q
 
     def update_q_value(self, state, action, old_q, reward, future_rewards):
@@ -120,8 +185,8 @@ class NimAI():
         is the sum of the current reward and estimated future rewards.
         """
         new_q = old_q + self.alpha * ((reward + future_rewards) - old_q)
-        self.q[tuple(state), action] = new_q
-        
+        self.q[self.key(state, action)] = new_q
+
 
     def best_future_reward(self, state):
         """
@@ -135,8 +200,8 @@ class NimAI():
         """
         best_q = 0
 
-        for action in Nim.available_actions(list(state)):
-            temp_q = self.q.get((tuple(state), action), 0)
+        for action, key in self.keyed_actions(state):
+            temp_q = self.q.get(key, 0)
             if temp_q > best_q:
                 best_q = temp_q
         
@@ -158,15 +223,20 @@ class NimAI():
         If multiple actions have the same Q-value, any of those
         options is an acceptable return value.
         """
-        best_action = None
-        best_q = 0
-        statelist = list(state)
-
-        for action in Nim.available_actions(list(state)):
-            temp_q = self.get_q_value(state, action)
-            if temp_q > best_q or best_action is None:
+        pairs = self.keyed_actions(state)
+
+        # ties are broken at random : taking the first best action would mean,
+        # as long as Q-values are 0, always taking 1 item from the first pile
+        best_actions = []
+        best_q = None
+        for action, key in pairs:
+            temp_q = self.q.get(key, 0)
+            if best_q is None or temp_q > best_q:
                 best_q = temp_q
-                best_action = action
+                best_actions = [action]
+            elif temp_q == best_q:
+                best_actions.append(action)
+        best_action = random.choice(best_actions) if best_actions else None
 
         # greedy approach
         if epsilon == False:
@@ -176,71 +246,351 @@ class NimAI():
         else:
             n = random.uniform(0, 1)
             if n < self.epsilon:
-                random_action = random.choices(list(Nim.available_actions(list(state))))
+                random_action = random.choice(pairs)
                 return random_action[0]
             else:
                 return best_action
 
+    def snapshot(self):
+        """
+        Return a copy of the Q-values, to measure later how much they moved (see distance).
+        """
+        return self.q.copy()
+
+    def distance(self, snapshot):
+        """
+        Return the mean absolute difference between the Q-values and a `snapshot` of them.
+        """
+        if not self.q:
+            return 0
+        return sum(abs(q - snapshot.get(key, 0)) for key, q in self.q.items()) / len(self.q)
+
+    def size(self):
+        """
+        Return the number of Q-values stored.
+        """
+        return len(self.q)
+
+    def merge(self, tables):
+        """
+        Merge Q-tables trained in parallel from the current Q-values : every Q-value
+        changed by some of the tables becomes the mean of their values for it.
+        """
+        changed = dict()
+        for table in tables:
+            for key, q in table.items():
+                if q != self.q.get(key, 0):
+                    changed.setdefault(key, []).append(q)
+        for key, values in changed.items():
+            self.q[key] = sum(values) / len(values)
+
+    def save(self, filename):
+        """
+        Save the AI to `filename` (see write_qfile), as sparse records :
+        only the Q-values in `self.q` are written.
+        Canonical Q-values are saved for every order of the piles.
+        """
+        radix, offsets, states, actions = table_layout(self.initial)
+        cells = dict()
+        if not self.canonical:
+            for (state, (i, j)), q in self.q.items():
+                index = sum(pile * weight for pile, weight in zip(state, radix))
+                cells[index * actions + offsets[i] + j - 1] = q
+        else:
+            # canonical : a state is sorted piles and `i` a pile size, expand each distinct state
+            # once to every order of its piles
+            entries = dict()
+            for (state, action), q in self.q.items():
+                entries.setdefault(state, []).append((action, q))
+            for state, state_entries in entries.items():
+                for piles in arrangements(state, self.initial):
+                    index = sum(pile * weight for pile, weight in zip(piles, radix))
+                    for (i, j), q in state_entries:
+                        for k, pile in enumerate(piles):
+                            if pile == i:
+                                cells[index * actions + offsets[k] + j - 1] = q
+
+        indices = array("q", sorted(cells))
+        values = array("d", [cells[index] for index in indices])
+        if sys.byteorder == "big":
+            indices.byteswap()
+            values.byteswap()
+        write_qfile(filename, self, values, indices)
+
+    @classmethod
+    def load(cls, filename, canonical=False):
+        """
+        Load an AI saved by `save` (by a NimAI or a DenseNimAI),
+        with canonical keys if `canonical` is True.
+        """
+        with open(filename, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                alpha, epsilon, initial, offset, records = read_qfile_header(data)
+                ai = cls(alpha, epsilon, initial, canonical)
+                radix, offsets, states, actions = table_layout(initial)
+
+                if records is not None:
+                    indices = array("q", data[offset:offset + 8 * records])
+                    values = array("d", data[offset + 8 * records:offset + 16 * records])
+                    if sys.byteorder == "big":
+                        indices.byteswap()
+                        values.byteswap()
+                else:
+                    # dense tables are written by DenseNimAI, which needs NumPy anyway
+                    import numpy as np
+                    table = np.frombuffer(data, dtype="<f8", count=states * actions, offset=offset)
+                    nonzero = np.flatnonzero(table)
+                    indices, values = nonzero.tolist(), table[nonzero].tolist()
+                    # no view of the memory map can outlive it
+                    del table
+
+        # rebuild the dictionary from the saved Q-values
+        for index, q in zip(indices, values):
+            state, column = divmod(index, actions)
+            piles = tuple((state // weight) % (pile + 1) for weight, pile in zip(radix, initial))
+            i = max(k for k in range(len(offsets)) if offsets[k] <= column)
+            ai.q[ai.key(piles, (i, column - offsets[i] + 1))] = q
+        return ai
+
+
+def arrangements(piles, limits):
+    """
+    Returns the distinct orders of the multiset `piles` where pile k is at most `limits[k]`,
+    each one once (permutations would repeat the orders of equal piles).
+    """
+    counts = dict()
+    for pile in piles:
+        counts[pile] = counts.get(pile, 0) + 1
+
+    orders = []
+    order = []
+
+    def place(k):
+        if k == len(limits):
+            orders.append(tuple(order))
+            return
+        for pile in counts:
+            if counts[pile] and pile <= limits[k]:
+                counts[pile] -= 1
+                order.append(pile)
+                place(k + 1)
+                order.pop()
+                counts[pile] += 1
+
+    place(0)
+    return orders
+
 
-def train(n):
+def table_layout(initial):
+    """
+    Returns the layout of a dense Q-table for games starting with the `initial` piles,
+    a `(radix, offsets, states, actions)` tuple :
+        - state `piles` is row `sum(piles[i] * radix[i])` (mixed radix over the pile sizes)
+        - action `(i, j)` is column `offsets[i] + j - 1`
+        - `states` and `actions` are the number of rows and columns
+    """
+    radix = []
+    offsets = []
+    states = 1
+    actions = 0
+    for pile in initial:
+        radix.append(states)
+        offsets.append(actions)
+        states *= pile + 1
+        actions += pile
+    return radix, offsets, states, actions
+
+
+def write_qfile(filename, ai, values, indices=None):
+    """
+    Write a Q-table file : a header, then either the dense Q-table (see table_layout) as
+    little-endian doubles, or if `indices` is given, sparse records : the little-endian
+    int64 cell indices (row * actions + column), then their doubles.
+    Data is aligned on 8 bytes so that the file can be memory-mapped as arrays.
+    The header holds the magic bytes, the format version, the number of piles,
+    `ai.alpha`, `ai.epsilon`, `ai.initial` and the number of records (QFILE_DENSE if dense).
+    """
+    records = QFILE_DENSE if indices is None else len(indices)
+    header = struct.pack(
+        f"<4sHHdd{len(ai.initial)}I",
+        QFILE_MAGIC, QFILE_VERSION, len(ai.initial), ai.alpha, ai.epsilon, *ai.initial
+    )
+    header += bytes(-len(header) % 8)
+    header += struct.pack("<Q", records)
+    with open(filename, "wb") as f:
+        f.write(header)
+        if indices is not None:
+            f.write(indices)
+        f.write(values)
+
+
+def read_qfile_header(data):
+    """
+    Read the header of a Q-table file from `data` (bytes or a memory map).
+    Returns `(alpha, epsilon, initial, offset, records)`, `offset` being where the Q-values
+    start and `records` the number of sparse records, or None for a dense table.
+    Version 1 files (always dense) are read too.
+    """
+    magic, version, count, alpha, epsilon = struct.unpack_from("<4sHHdd", data)
+    if magic != QFILE_MAGIC:
+        raise ValueError("Not a Nim Q-table file")
+    if version not in (1, QFILE_VERSION):
+        raise ValueError(f"Unsupported Q-table file version {version}")
+
+    initial = list(struct.unpack_from(f"<{count}I", data, struct.calcsize("<4sHHdd")))
+    offset = struct.calcsize(f"<4sHHdd{count}I")
+    offset += -offset % 8
+
+    records = None
+    if version > 1:
+        records, = struct.unpack_from("<Q", data, offset)
+        offset += 8
+        if records == QFILE_DENSE:
+            records = None
+    return alpha, epsilon, initial, offset, records
+
+
+def train(n, player=None, initial=[1, 3, 5, 7], verbose=True, report_every=None):
     """
     Train an AI by playing `n` games against itself.
+    If `player` is given (a NimAI or DenseNimAI), keep training it instead of a new NimAI
+    playing games that start with the `initial` piles.
+    If `verbose` is False, nothing is printed for each game; every `report_every` games
+    (if set), the training speed and convergence are printed instead (see report).
     """
 
-    player = NimAI()
+    if player is None:
+        player = NimAI(initial=initial)
+
+    start = time.perf_counter()
+    snapshot = player.snapshot() if report_every else None
 
     # Play n games
     for i in range(n):
-        print(f"Playing training game {i + 1}")
-        game = Nim()
-
-        # Keep track of last move made by either player
-        last = {
-            0: {"state": None, "action": None},
-            1: {"state": None, "action": None}
-        }
-
-        # Game loop
-        while True:
-
-            # Keep track of current state and action
-            state = game.piles.copy()
-            action = player.choose_action(game.piles)
-
-            # Keep track of last state and action
-            last[game.player]["state"] = state
-            last[game.player]["action"] = action
-
-            # Make move
-            game.move(action)
-            new_state = game.piles.copy()
-
-            # When game is over, update Q values with rewards
-            if game.winner is not None:
-                player.update(state, action, new_state, -1)
-                player.update(
-                    last[game.player]["state"],
-                    last[game.player]["action"],
-                    new_state,
-                    1
-                )
-                break
-
-            # If game is continuing, no rewards yet
-            elif last[game.player]["state"] is not None:
-                player.update(
-                    last[game.player]["state"],
-                    last[game.player]["action"],
-                    new_state,
-                    0
-                )
-
-    print("Done training")
+        if verbose:
+            print(f"Playing training game {i + 1}")
+        training_game(player)
+
+        if report_every and (i + 1) % report_every == 0:
+            report(player, i + 1, time.perf_counter() - start, snapshot)
+            snapshot = player.snapshot()
+
+    if verbose:
+        print("Done training")
 
     # Return the trained AI
     return player
 
 
+def training_game(player):
+    """
+    Play one game of `player` against itself, updating its Q-values after every move.
+    """
+    game = Nim(player.initial)
+
+    # Keep track of last move made by either player
+    last = {
+        0: {"state": None, "action": None},
+        1: {"state": None, "action": None}
+    }
+
+    # Game loop
+    while True:
+
+        # Keep track of current state and action
+        state = game.piles.copy()
+        action = player.choose_action(game.piles)
+
+        # Keep track of last state and action
+        last[game.player]["state"] = state
+        last[game.player]["action"] = action
+
+        # Make move
+        game.move(action)
+        new_state = game.piles.copy()
+
+        # When game is over, update Q values with rewards
+        if game.winner is not None:
+            player.update(state, action, new_state, -1)
+            player.update(
+                last[game.player]["state"],
+                last[game.player]["action"],
+                new_state,
+                1
+            )
+            break
+
+        # If game is continuing, no rewards yet
+        elif last[game.player]["state"] is not None:
+            player.update(
+                last[game.player]["state"],
+                last[game.player]["action"],
+                new_state,
+                0
+            )
+
+
+def report(player, games, elapsed, snapshot):
+    """
+    Print training progress : games played, games per second, and how much the
+    Q-values moved since `snapshot` (mean absolute change, close to 0 once converged).
+    """
+    print(
+        f"Trained {games} games ({games / elapsed:.0f} games/s), "
+        f"mean Q change {player.distance(snapshot):.5f}, "
+        f"{player.size()} Q-values"
+    )
+
+
+def train_worker(player, n, seed):
+    """
+    Worker process of train_parallel : train a copy of `player` for `n` games, return its Q-table.
+    """
+    random.seed(seed)
+    train(n, player, verbose=False)
+    return player.q
+
+
+def train_parallel(n, workers=None, player=None, initial=[1, 3, 5, 7], sync_every=1000, report_every=None, seed=None):
+    """
+    Train an AI by playing `n` games against itself, over `workers` processes
+    (`player` and `initial` are used like in train).
+    Games are played in rounds of `sync_every` games : each worker plays its share of the round
+    on its own copy of the AI, then the Q-tables of the workers are merged (see NimAI.merge)
+    and the next round starts from the merged table.
+    Prints the training speed and convergence every `report_every` games (if set).
+    """
+    if player is None:
+        player = NimAI(initial=initial)
+    if workers is None:
+        workers = os.cpu_count()
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+
+    start = time.perf_counter()
+    snapshot = player.snapshot() if report_every else None
+    played = 0
+    reported = 0
+
+    with multiprocessing.Pool(workers) as pool:
+        while played < n:
+            size = min(sync_every, n - played)
+            shares = [size // workers + (1 if k < size % workers else 0) for k in range(workers)]
+            jobs = [
+                (player, share, seed + played + k)
+                for k, share in enumerate(shares) if share > 0
+            ]
+            player.merge(pool.starmap(train_worker, jobs))
+            played += size
+
+            if report_every and played - reported >= report_every:
+                report(player, played, time.perf_counter() - start, snapshot)
+                snapshot = player.snapshot()
+                reported = played
+
+    return player
+
+
 def play(ai, human_player=None):
     """
     Play game, human against the AI. `human_player` can be set to 0 or 1 to specify whether human player
@@ -1,4 +1,24 @@
-from nim import train, play
+import os
+import sys
+
+from nim import NimAI, train, play
+
+# trained AI, saved after the first launch so the next ones start instantly
+FILENAME = "nim.q"
+
+if len(sys.argv) > 2:
+    sys.exit("Usage: python play.py [training games]")
+games = int(sys.argv[1]) if len(sys.argv) == 2 else 0
+
+if os.path.exists(FILENAME):
+    ai = NimAI.load(FILENAME)
+else:
+    ai = NimAI()
+    games = max(games, 10000)
+
+# train a new AI, or keep training the saved one if asked to
+if games:
+    ai = train(games, ai, verbose=False)
+    ai.save(FILENAME)
 
-ai = train(10000)
 play(ai)
@@ -0,0 +1,233 @@
+"""
+Dense Q-table backend for NimAI, backed by NumPy arrays.
+
+Every piles state gets an index (mixed radix over the pile sizes), and every action `(i, j)`
+a column of a padded `states x actions` array, with a mask of which actions are legal in
+which state. Best action and best future reward are then a single vectorized operation.
+
+Usage: python qtable.py  reports memory and update time for a few pile configurations.
+"""
+
+import random
+import sys
+import time
+
+import numpy as np
+
+from nim import Nim, NimAI, table_layout, write_qfile, read_qfile_header
+
+
+class DenseQTable():
+
+    def __init__(self, initial=[1, 3, 5, 7]):
+        """
+        Initialize an all zeros Q-table for games starting with the `initial` piles.
+        Each table has
+            - `radix`: weight of each pile in a state index
+            - `action_pile`, `action_count`: the `(i, j)` action of each column
+            - `values`: the Q-values, one row per state and one column per action
+            - `legal`: True where the action can be made in the state
+        Illegal actions are never updated, so their Q-value stays 0.
+        """
+        self.initial = list(initial)
+        sizes = [pile + 1 for pile in self.initial]
+        self.radix, self.offsets, states, actions = table_layout(self.initial)
+
+        self.action_pile = np.array([i for i, pile in enumerate(self.initial) for j in range(pile)])
+        self.action_count = np.array([j + 1 for pile in self.initial for j in range(pile)])
+
+        # piles of every state, in state index order
+        piles = np.indices(sizes[::-1]).reshape(len(sizes), -1)[::-1].T
+        self.values = np.zeros((states, actions))
+        self.legal = piles[:, self.action_pile] >= self.action_count
+
+    def state_index(self, state):
+        """
+        Returns the row of the state `state` (a list or tuple of piles).
+        """
+        return sum(pile * weight for pile, weight in zip(state, self.radix))
+
+    def action_index(self, action):
+        """
+        Returns the column of the action `(i, j)`.
+        """
+        i, j = action
+        return self.offsets[i] + j - 1
+
+    def action(self, index):
+        """
+        Returns the action `(i, j)` of a column.
+        """
+        return (int(self.action_pile[index]), int(self.action_count[index]))
+
+    def nbytes(self):
+        """
+        Returns the memory used by the table arrays, in bytes.
+        """
+        return self.values.nbytes + self.legal.nbytes
+
+
+class DenseNimAI(NimAI):
+
+    def __init__(self, alpha=0.5, epsilon=0.1, initial=[1, 3, 5, 7]):
+        """
+        Initialize AI with an all zeros dense Q-table (see DenseQTable) instead of
+        a Q-learning dictionary. It behaves like NimAI.
+        """
+        super().__init__(alpha, epsilon, initial)
+        self.q = DenseQTable(self.initial)
+
+    def get_q_value(self, state, action):
+        """
+        Return the Q-value for the state `state` and the action `action`.
+        """
+        return float(self.q.values[self.q.state_index(state), self.q.action_index(action)])
+
+    def update(self, old_state, action, new_state, reward):
+        """
+        Update Q-learning model, like NimAI.update.
+        """
+        s, a = self.q.state_index(old_state), self.q.action_index(action)
+        old = float(self.q.values[s, a])
+        self.update_q_value(old_state, action, old, reward, self.best_future_reward(new_state))
+
+    def update_q_value(self, state, action, old_q, reward, future_rewards):
+        """
+        Update the Q-value for the state `state` and the action `action`
+        (same formula as NimAI.update_q_value).
+        """
+        new_q = old_q + self.alpha * ((reward + future_rewards) - old_q)
+        self.q.values[self.q.state_index(state), self.q.action_index(action)] = new_q
+
+    def best_future_reward(self, state):
+        """
+        Return the maximum Q-value of the actions available in `state`, or 0 if
+        there are none or if they are all negative (like NimAI.best_future_reward).
+        """
+        # illegal actions are worth 0, so they give the floor at 0 for free
+        # (a state without legal actions is a row of zeros)
+        return float(self.q.values[self.q.state_index(state)].max())
+
+    def choose_action(self, state, epsilon=True):
+        """
+        Given a state `state`, return an action `(i, j)` to take : the best one,
+        or with probability `self.epsilon` (if `epsilon` is True) a random one.
+        """
+        s = self.q.state_index(state)
+        legal = self.q.legal[s]
+
+        if epsilon and random.uniform(0, 1) < self.epsilon:
+            return self.q.action(random.choice(np.flatnonzero(legal)))
+
+        # ties are broken at random, like NimAI.choose_action
+        q = np.where(legal, self.q.values[s], -np.inf)
+        return self.q.action(int(random.choice(np.flatnonzero(q == q.max()))))
+
+    def snapshot(self):
+        """
+        Return a copy of the Q-values, to measure later how much they moved (see distance).
+        """
+        return self.q.values.copy()
+
+    def distance(self, snapshot):
+        """
+        Return the mean absolute difference between the legal Q-values and a `snapshot` of them.
+        """
+        return float(np.abs(self.q.values - snapshot)[self.q.legal].mean())
+
+    def size(self):
+        """
+        Return the number of Q-values stored (one per legal state and action).
+        """
+        return int(self.q.legal.sum())
+
+    def merge(self, tables):
+        """
+        Merge Q-tables trained in parallel from the current Q-values : every Q-value
+        changed by some of the tables becomes the mean of their values for it.
+        """
+        values = np.stack([table.values for table in tables])
+        changed = values != self.q.values
+        count = changed.sum(axis=0)
+        total = np.where(changed, values, 0).sum(axis=0)
+        self.q.values = np.where(count > 0, total / np.maximum(count, 1), self.q.values)
+
+    def save(self, filename):
+        """
+        Save the AI to `filename`, in the same format as NimAI.save.
+        """
+        write_qfile(filename, self, self.q.values.astype("<f8").tobytes())
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Load an AI saved by `save` (by a NimAI or a DenseNimAI). Dense Q-values are memory-mapped
+        copy-on-write : loading is instant, and training the AI never changes the file.
+        Sparse Q-values (saved by a NimAI) are scattered into a new table.
+        """
+        with open(filename, "rb") as f:
+            alpha, epsilon, initial, offset, records = read_qfile_header(f.read(4096))
+        ai = cls(alpha, epsilon, initial)
+        shape = ai.q.values.shape
+        if records is None:
+            ai.q.values = np.memmap(filename, dtype="<f8", mode="c", offset=offset, shape=shape)
+        else:
+            indices = np.fromfile(filename, dtype="<i8", count=records, offset=offset)
+            values = np.fromfile(filename, dtype="<f8", count=records, offset=offset + 8 * records)
+            ai.q.values.flat[indices] = values
+        return ai
+
+
+def transitions(initial, count):
+    """
+    Returns `count` random `(state, action, new_state)` transitions of a game starting with `initial`.
+    """
+    samples = []
+    while len(samples) < count:
+        game = Nim(initial)
+        while game.winner is None and len(samples) < count:
+            state = game.piles.copy()
+            action = random.choice(list(Nim.available_actions(game.piles)))
+            game.move(action)
+            samples.append((state, action, game.piles.copy()))
+    return samples
+
+
+def update_time(ai, samples):
+    """
+    Returns the mean time of one Q-learning update of `ai`, in seconds.
+    """
+    start = time.perf_counter()
+    for state, action, new_state in samples:
+        ai.update(state, action, new_state, 0)
+    return (time.perf_counter() - start) / len(samples)
+
+
+def main():
+    configurations = [[1, 3, 5, 7], [3, 5, 7, 9], [1, 3, 5, 7, 9], [5, 10, 15, 20]]
+    if len(sys.argv) > 1:
+        configurations = [[int(pile) for pile in sys.argv[1:]]]
+
+    for initial in configurations:
+        samples = transitions(initial, 20000)
+
+        dense = DenseNimAI(initial=initial)
+        dense_time = update_time(dense, samples)
+
+        ai = NimAI(initial=initial)
+        dict_time = update_time(ai, samples)
+
+        # rough size of the dict : the dict itself plus its keys (tuple of state, action) and values
+        dict_bytes = sys.getsizeof(ai.q) + sum(
+            sys.getsizeof(key) + sys.getsizeof(key[0]) + sys.getsizeof(key[1]) + sys.getsizeof(value)
+            for key, value in ai.q.items()
+        )
+
+        print(f"Piles {initial}: {dense.q.values.shape[0]} states x {dense.q.values.shape[1]} actions")
+        print(f"    dense: {dense.q.nbytes() / 1024:.1f} KiB, {dense_time * 1e6:.2f} us/update")
+        print(f"    dict:  {dict_bytes / 1024:.1f} KiB ({len(ai.q)} entries after {len(samples)} updates), "
+              f"{dict_time * 1e6:.2f} us/update")
+
+
+if __name__ == "__main__":
+    main()
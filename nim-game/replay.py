@@ -0,0 +1,193 @@
+"""
+Experience replay training for DenseNimAI : games are first simulated into a compact
+transition buffer, then Q-learning updates are applied in vectorized batches, optionally
+sampling old transitions again (replay). Simulation and learning are timed separately.
+
+Usage: python replay.py [games] [epochs] [--replay]
+"""
+
+import sys
+import time
+from array import array
+
+import numpy as np
+
+from nim import Nim
+from qtable import DenseNimAI
+from solver import evaluate
+
+
+class TransitionBuffer():
+
+    def __init__(self, capacity=100000):
+        """
+        Initialize an empty buffer of at most `capacity` transitions, each one stored as
+        the row of the old state, the column of the action, the reward and the row of the
+        new state (see DenseQTable) in typed arrays. Once full, the oldest transitions
+        are overwritten.
+        """
+        self.capacity = capacity
+        self.states = array("q")
+        self.actions = array("l")
+        self.rewards = array("b")
+        self.new_states = array("q")
+        self.next = 0
+
+    def __len__(self):
+        return len(self.states)
+
+    def add(self, state, action, reward, new_state):
+        """
+        Add a transition (rows and columns of a DenseQTable).
+        """
+        if len(self.states) < self.capacity:
+            self.states.append(state)
+            self.actions.append(action)
+            self.rewards.append(reward)
+            self.new_states.append(new_state)
+        else:
+            self.states[self.next] = state
+            self.actions[self.next] = action
+            self.rewards[self.next] = reward
+            self.new_states[self.next] = new_state
+        self.next = (self.next + 1) % self.capacity
+
+    def arrays(self):
+        """
+        Returns the transitions as NumPy arrays (views of the buffer, no copy) :
+        `(states, actions, rewards, new_states)`.
+        """
+        return (
+            np.frombuffer(self.states, dtype=np.int64),
+            np.frombuffer(self.actions, dtype=np.dtype(f"i{self.actions.itemsize}")),
+            np.frombuffer(self.rewards, dtype=np.int8),
+            np.frombuffer(self.new_states, dtype=np.int64)
+        )
+
+    def clear(self):
+        """
+        Remove every transition.
+        """
+        self.__init__(self.capacity)
+
+
+def simulate(ai, games, buffer):
+    """
+    Play `games` games of `ai` against itself without learning, adding every
+    transition to `buffer`. Rewards are the ones train gives : -1 for the move
+    that ends the game, 1 for the last move of the winner, 0 otherwise.
+    Returns the indices of the added transitions, in order.
+    """
+    table = ai.q
+    added = []
+
+    def record(state, action, reward, new_state):
+        added.append(buffer.next)
+        buffer.add(table.state_index(state), table.action_index(action), reward, table.state_index(new_state))
+
+    for _ in range(games):
+        game = Nim(ai.initial)
+        last = {0: None, 1: None}
+
+        while True:
+            state = game.piles.copy()
+            action = ai.choose_action(game.piles)
+            last[game.player] = (state, action)
+
+            game.move(action)
+            new_state = game.piles.copy()
+
+            if game.winner is not None:
+                record(state, action, -1, new_state)
+                record(*last[game.player], 1, new_state)
+                break
+            elif last[game.player] is not None:
+                record(*last[game.player], 0, new_state)
+
+    return added
+
+
+def batch_update(ai, buffer, indices):
+    """
+    Apply the Q-learning update of NimAI.update to the transitions `indices` of `buffer`,
+    in vectorized rounds : a (state, action) pair repeated in the batch is updated once per
+    round, in batch order, so that repeated updates add up as they would one at a time.
+    Every target is computed from the Q-values before its round.
+    Returns the number of updates applied.
+    """
+    states, actions, rewards, new_states = buffer.arrays()
+    indices = np.asarray(indices)
+    s, a = states[indices], actions[indices]
+
+    # rank of each transition among the ones of the same pair, in batch order
+    cells = s * ai.q.values.shape[1] + a
+    order = np.argsort(cells, kind="stable")
+    grouped = cells[order]
+    first = np.r_[True, grouped[1:] != grouped[:-1]]
+    positions = np.arange(len(cells))
+    ranks = np.empty(len(cells), dtype=np.int64)
+    ranks[order] = positions - np.maximum.accumulate(np.where(first, positions, 0))
+
+    for rank in range(ranks.max() + 1 if len(ranks) else 0):
+        batch = indices[ranks == rank]
+        s, a = states[batch], actions[batch]
+        # illegal actions stay at 0, so a row max is NimAI.best_future_reward
+        future = ai.q.values[new_states[batch]].max(axis=1)
+        old = ai.q.values[s, a]
+        ai.q.values[s, a] = old + ai.alpha * ((rewards[batch] + future) - old)
+    return len(indices)
+
+
+def train_replay(n, ai=None, games_per_round=100, batch_size=64, epochs=1, replay=False, capacity=100000, seed=None):
+    """
+    Train a DenseNimAI (a new one if `ai` is None) on `n` games.
+    Each round simulates `games_per_round` games into the buffer, then learns `epochs` times
+    from batches of `batch_size` transitions : the new transitions in order, or if `replay`
+    is True the same number of transitions sampled from the whole buffer.
+    Returns `(ai, stats)`, stats holding the time spent simulating and learning.
+    """
+    if ai is None:
+        ai = DenseNimAI()
+    rng = np.random.default_rng(seed)
+    buffer = TransitionBuffer(capacity)
+    stats = {"games": 0, "transitions": 0, "updates": 0, "simulation_time": 0.0, "learning_time": 0.0}
+
+    while stats["games"] < n:
+        games = min(games_per_round, n - stats["games"])
+
+        start = time.perf_counter()
+        added = simulate(ai, games, buffer)
+        stats["simulation_time"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(epochs):
+            if replay:
+                batches = [rng.integers(len(buffer), size=batch_size) for _ in range(0, len(added), batch_size)]
+            else:
+                batches = [added[k:k + batch_size] for k in range(0, len(added), batch_size)]
+            for batch in batches:
+                stats["updates"] += batch_update(ai, buffer, batch)
+        stats["learning_time"] += time.perf_counter() - start
+
+        stats["games"] += games
+        stats["transitions"] += len(added)
+
+    return ai, stats
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if arg != "--replay"]
+    n = int(args[0]) if args else 10000
+    epochs = int(args[1]) if len(args) > 1 else 1
+    replay = "--replay" in sys.argv
+
+    ai, stats = train_replay(n, epochs=epochs, replay=replay)
+    print(f"Simulated {stats['games']} games ({stats['transitions']} transitions) in "
+          f"{stats['simulation_time']:.2f} s ({stats['games'] / stats['simulation_time']:.0f} games/s)")
+    print(f"Applied {stats['updates']} updates in {stats['learning_time']:.3f} s "
+          f"({stats['updates'] / stats['learning_time']:.0f} updates/s)")
+    print(f"AI plays a winning move in {evaluate(ai)['accuracy']:.1%} of winning states")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Exact Nim solver, used as a reference to check how well a NimAI has learned.
+
+Nim.move implements the misère rule (the player who takes the last object loses), solved here
+by retrograde analysis. The normal rule (the player who takes the last object wins) is solved
+with the nim-sum.
+
+Usage: python solver.py [qfile]  scores a saved NimAI (or a freshly trained one) against the solver.
+"""
+
+import sys
+from functools import lru_cache, reduce
+from operator import xor
+
+import numpy as np
+
+from nim import Nim, NimAI, train
+from qtable import DenseNimAI, DenseQTable
+
+
+def nim_sum(piles):
+    """
+    Returns the nim-sum (xor of every pile) of `piles`.
+    """
+    return reduce(xor, piles, 0)
+
+
+def normal_moves(piles):
+    """
+    Returns the set of winning actions `(i, j)` under the normal rule :
+    the ones leaving a nim-sum of 0. Empty if the position is lost.
+    """
+    total = nim_sum(piles)
+    moves = set()
+    if total == 0:
+        return moves
+    for i, pile in enumerate(piles):
+        target = pile ^ total
+        if target < pile:
+            moves.add((i, pile - target))
+    return moves
+
+
+@lru_cache(maxsize=None)
+def misere_wins(piles):
+    """
+    Returns True if the player to move wins `piles` (a sorted tuple) under the misère rule.
+    Results are cached, and since piles are sorted, every permutation of a position
+    shares the same entry.
+    """
+    # the other player just took the last object : they lost
+    if not any(piles):
+        return True
+
+    for i, pile in enumerate(piles):
+        if i > 0 and piles[i - 1] == pile:
+            # same pile as the previous one, same moves
+            continue
+        for count in range(1, pile + 1):
+            child = piles[:i] + (pile - count,) + piles[i + 1:]
+            if not misere_wins(tuple(sorted(child))):
+                return True
+    return False
+
+
+def misere_moves(piles):
+    """
+    Returns the set of winning actions `(i, j)` under the misère rule (the rule of Nim.move) :
+    the ones leaving a position lost for the other player. Empty if the position is lost.
+    """
+    moves = set()
+    for i, j in Nim.available_actions(piles):
+        child = list(piles)
+        child[i] -= j
+        if not misere_wins(tuple(sorted(child))):
+            moves.add((i, j))
+    return moves
+
+
+def optimal_moves(piles, misere=True):
+    """
+    Returns the set of optimal actions for `piles` : the winning ones,
+    or every available action if the position is lost anyway.
+    """
+    moves = misere_moves(piles) if misere else normal_moves(piles)
+    return moves or Nim.available_actions(piles)
+
+
+def retrograde(table):
+    """
+    Solve every state of a DenseQTable under the misère rule, from the empty piles up.
+    Returns `(wins, winning)` : `wins[s]` is True if the player to move wins state s, and
+    `winning[s, a]` is True if action a is legal and leaves a lost state.
+    """
+    # state reached by every action from every state (only meaningful where legal)
+    radix = np.array(table.radix)
+    states = np.arange(len(table.values))[:, np.newaxis]
+    children = states - table.action_count * radix[table.action_pile]
+    children = np.where(table.legal, children, 0)
+
+    # a move always removes objects, so solve by number of objects left
+    piles = np.stack([(states[:, 0] // weight) % (pile + 1) for weight, pile in zip(table.radix, table.initial)], 1)
+    objects = piles.sum(axis=1)
+    wins = np.zeros(len(states), dtype=bool)
+    for total in range(objects.max() + 1):
+        layer = np.flatnonzero(objects == total)
+        if total == 0:
+            wins[layer] = True
+        else:
+            wins[layer] = np.any(table.legal[layer] & ~wins[children[layer]], axis=1)
+
+    winning = table.legal & ~wins[children]
+    return wins, winning
+
+
+def dense_table(ai):
+    """
+    Returns the Q-table of a NimAI or DenseNimAI as a DenseQTable.
+    """
+    if isinstance(ai, DenseNimAI):
+        return ai.q
+
+    table = DenseQTable(ai.initial)
+    if ai.canonical:
+        # every state and action reads the Q-value of its canonical key
+        for s, a in zip(*np.nonzero(table.legal)):
+            state = [(s // weight) % (pile + 1) for weight, pile in zip(table.radix, table.initial)]
+            table.values[s, a] = ai.get_q_value(state, table.action(a))
+    elif ai.q:
+        keys = list(ai.q.keys())
+        rows = [table.state_index(state) for state, action in keys]
+        columns = [table.action_index(action) for state, action in keys]
+        table.values[rows, columns] = list(ai.q.values())
+    return table
+
+
+def evaluate(ai):
+    """
+    Scores the greedy policy of `ai` against the solver, over every state of its games at once.
+    Returns a dict with the number of winning states (where an optimal move exists),
+    how many of them the AI plays optimally, and the corresponding accuracy.
+    Ties between Q-values are broken by the first action in table order.
+    """
+    table = dense_table(ai)
+    wins, winning = retrograde(table)
+
+    # greedy action of every state
+    greedy = np.argmax(np.where(table.legal, table.values, -np.inf), axis=1)
+    correct = winning[np.arange(len(greedy)), greedy]
+
+    # only positions with a legal move where the outcome depends on the move
+    decisive = wins & table.legal.any(axis=1)
+    return {
+        "states": int(table.legal.any(axis=1).sum()),
+        "winning_states": int(decisive.sum()),
+        "optimal": int((correct & decisive).sum()),
+        "accuracy": float((correct & decisive).sum() / max(decisive.sum(), 1))
+    }
+
+
+def main():
+    if len(sys.argv) > 2:
+        sys.exit("Usage: python solver.py [qfile]")
+
+    if len(sys.argv) == 2:
+        ai = NimAI.load(sys.argv[1])
+    else:
+        ai = train(10000, verbose=False)
+
+    score = evaluate(ai)
+    print(f"Piles {ai.initial}: {score['states']} states, {score['winning_states']} winning for the player to move")
+    print(f"AI plays a winning move in {score['optimal']} of them ({score['accuracy']:.1%})")
+
+
+if __name__ == "__main__":
+    main()
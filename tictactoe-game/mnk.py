@@ -0,0 +1,306 @@
+"""
+m,n,k game player : tic tac toe generalized to a board of m rows and n columns,
+where the first player to align k stones wins (3,3,3 is tic tac toe, 15,15,5 is gomoku).
+"""
+
+import math
+import time
+
+from tictactoe import X, O, EMPTY, InvalidAction
+
+# score of a won game, bigger than any heuristic evaluation
+WIN = 10 ** 9
+
+# directions a line can go in (right, down, and the two diagonals)
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+# boards of more cells than this only search the cells close to a stone (see candidates)
+NEARBY_CELLS = 25
+
+# cache of board geometries, see geometry()
+geometries = dict()
+
+# positions searched by negamax, to compare engines
+nodes = 0
+
+
+class Timeout(Exception):
+    pass
+
+
+def geometry(m, n, k):
+    """
+    Returns the `(windows, cell_windows)` pair of a m,n,k board, computed once per board size.
+    `windows` is the list of every line of k cells (as lists of cell indices, cell (i, j) being
+    i * n + j), and `cell_windows[c]` lists the windows containing the cell c.
+    """
+    key = (m, n, k)
+    if key not in geometries:
+        windows = []
+        cell_windows = [[] for _ in range(m * n)]
+        for i in range(m):
+            for j in range(n):
+                for di, dj in DIRECTIONS:
+                    # only keep lines that fit in the board
+                    endi, endj = i + di * (k - 1), j + dj * (k - 1)
+                    if not (0 <= endi < m and 0 <= endj < n):
+                        continue
+                    window = [(i + di * s) * n + (j + dj * s) for s in range(k)]
+                    for cell in window:
+                        cell_windows[cell].append(len(windows))
+                    windows.append(window)
+        geometries[key] = (windows, cell_windows)
+    return geometries[key]
+
+
+class Board():
+
+    def __init__(self, m=3, n=3, k=3):
+        """
+        Initialize an empty board of `m` rows and `n` columns, where `k` stones in a row win.
+        Each board also keeps, for every window of k cells, how many X and O stones it holds,
+        so winning and evaluating only look at the windows around the last move.
+        """
+        self.m = m
+        self.n = n
+        self.k = k
+        self.windows, self.cell_windows = geometry(m, n, k)
+        self.cells = [EMPTY] * (m * n)
+        self.xcount = [0] * len(self.windows)
+        self.ocount = [0] * len(self.windows)
+        self.moves = 0
+        self.won = None
+
+        # heuristic evaluation of the board for X, updated on every move
+        self.score = 0
+
+    def copy(self):
+        """
+        Returns a copy of the board.
+        """
+        board = Board.__new__(Board)
+        board.__dict__.update(self.__dict__)
+        board.cells = self.cells.copy()
+        board.xcount = self.xcount.copy()
+        board.ocount = self.ocount.copy()
+        return board
+
+    def window_score(self, w):
+        """
+        Returns the heuristic value of window `w` for X : a window only holding stones
+        of one player is worth more the more stones it has, a mixed window is worth nothing.
+        """
+        x, o = self.xcount[w], self.ocount[w]
+        if o == 0:
+            return 4 ** x - 1
+        if x == 0:
+            return 1 - 4 ** o
+        return 0
+
+    def play(self, cell):
+        """
+        Put the stone of the current player on `cell`, updating the windows around it.
+        """
+        stone = X if self.moves % 2 == 0 else O
+        counts = self.xcount if stone == X else self.ocount
+        self.cells[cell] = stone
+        self.moves += 1
+        for w in self.cell_windows[cell]:
+            old = self.window_score(w)
+            counts[w] += 1
+            self.score += self.window_score(w) - old
+            if counts[w] == self.k:
+                self.won = stone
+
+    def undo(self, cell):
+        """
+        Remove the last stone played, which is on `cell`.
+        """
+        stone = self.cells[cell]
+        counts = self.xcount if stone == X else self.ocount
+        self.cells[cell] = EMPTY
+        self.moves -= 1
+        self.won = None
+        for w in self.cell_windows[cell]:
+            old = self.window_score(w)
+            counts[w] -= 1
+            self.score += self.window_score(w) - old
+
+
+def initial_state(m=3, n=3, k=3):
+    """
+    Returns starting state of a m,n,k board.
+    """
+    return Board(m, n, k)
+
+
+def to_list(board):
+    """
+    Returns the board as a nested list of rows, like a tictactoe board.
+    """
+    return [board.cells[i * board.n:(i + 1) * board.n] for i in range(board.m)]
+
+
+def player(board):
+    """
+    Returns player who has the next turn on a board.
+    """
+    return X if board.moves % 2 == 0 else O
+
+
+def actions(board):
+    """
+    Returns set of all possible actions (i, j) available on the board.
+    """
+    return set(divmod(cell, board.n) for cell, stone in enumerate(board.cells) if stone == EMPTY)
+
+
+def result(board, action):
+    """
+    Returns the board that results from making move (i, j) on the board.
+    """
+    i, j = action
+    if not (0 <= i < board.m and 0 <= j < board.n) or board.cells[i * board.n + j] != EMPTY:
+        raise InvalidAction('Action is not valid')
+
+    newboard = board.copy()
+    newboard.play(i * board.n + j)
+    return newboard
+
+
+def winner(board):
+    """
+    Returns the winner of the game, if there is one.
+    """
+    return board.won
+
+
+def terminal(board):
+    """
+    Returns True if game is over, False otherwise.
+    """
+    return board.won is not None or board.moves == board.m * board.n
+
+
+def utility(board):
+    """
+    Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
+    """
+    if board.won == X:
+        return 1
+    elif board.won == O:
+        return -1
+    return 0
+
+
+def candidates(board):
+    """
+    Returns the empty cells worth searching, sorted by how many lines they extend or block :
+    every empty cell, or on boards of more than NEARBY_CELLS cells, only the cells close
+    to a stone (at most 2 cells away), and the center for the first move.
+    """
+    if board.m * board.n <= NEARBY_CELLS:
+        cells = [cell for cell, stone in enumerate(board.cells) if stone == EMPTY]
+    elif board.moves == 0:
+        return [(board.m // 2) * board.n + board.n // 2]
+    else:
+        cells = set()
+        for cell, stone in enumerate(board.cells):
+            if stone == EMPTY:
+                continue
+            i, j = divmod(cell, board.n)
+            for ni in range(max(0, i - 2), min(board.m, i + 3)):
+                for nj in range(max(0, j - 2), min(board.n, j + 3)):
+                    if board.cells[ni * board.n + nj] == EMPTY:
+                        cells.add(ni * board.n + nj)
+
+    # a cell is interesting if it lies on windows already holding stones of only one player
+    def threat(cell):
+        value = 0
+        for w in board.cell_windows[cell]:
+            x, o = board.xcount[w], board.ocount[w]
+            if o == 0:
+                value += 4 ** x
+            if x == 0:
+                value += 4 ** o
+        return value
+
+    return sorted(cells, key=lambda cell: (-threat(cell), cell))
+
+
+def negamax(board, depth, alpha, beta, deadline, ply):
+    """
+    Alpha beta search of `depth` moves, returning the value of the board for the player to move.
+    Raises Timeout once `deadline` (a time.perf_counter() value) is reached.
+    """
+    global nodes
+    nodes += 1
+    if time.perf_counter() > deadline:
+        raise Timeout
+
+    # the previous player just won : the sooner, the worse for us
+    if board.won is not None:
+        return -(WIN - ply)
+    if board.moves == board.m * board.n:
+        return 0
+    if depth == 0:
+        return board.score if board.moves % 2 == 0 else -board.score
+
+    best = -math.inf
+    for cell in candidates(board):
+        board.play(cell)
+        try:
+            value = -negamax(board, depth - 1, -beta, -alpha, deadline, ply + 1)
+        finally:
+            board.undo(cell)
+        if value > best:
+            best = value
+        alpha = max(alpha, value)
+        if alpha >= beta:
+            break
+    return best
+
+
+def minimax(board, budget=1.0, max_depth=None):
+    """
+    Returns the best action found for the current player within `budget` seconds.
+    Searches 1 move ahead, then 2, and so on (iterative deepening), and keeps the best move
+    of the deepest search that had time to finish.
+    """
+    if terminal(board):
+        return None
+
+    deadline = time.perf_counter() + budget
+    empty = board.m * board.n - board.moves
+    max_depth = empty if max_depth is None else min(max_depth, empty)
+
+    # search on a copy, the caller's board is never modified
+    board = board.copy()
+    moves = candidates(board)
+    best = moves[0]
+    if len(moves) == 1:
+        return divmod(best, board.n)
+
+    for depth in range(1, max_depth + 1):
+        try:
+            values = dict()
+            alpha = -math.inf
+            for cell in moves:
+                board.play(cell)
+                try:
+                    values[cell] = -negamax(board, depth - 1, -math.inf, -alpha, deadline, 1)
+                finally:
+                    board.undo(cell)
+                alpha = max(alpha, values[cell])
+        except Timeout:
+            break
+
+        # search the best move first on the next iteration, it makes pruning a lot better
+        moves.sort(key=lambda cell: -values[cell])
+        best = moves[0]
+
+        # no need to look deeper once the game is decided
+        if abs(values[best]) >= WIN - board.m * board.n:
+            break
+
+    return divmod(best, board.n)
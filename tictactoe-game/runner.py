@@ -1,3 +1,4 @@
+import os
 import pygame
 import sys
 import time
@@ -17,6 +18,10 @@ mediumFont = pygame.font.Font("OpenSans-Regular.ttf", 28)
 largeFont = pygame.font.Font("OpenSans-Regular.ttf", 40)
 moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
 
+# load the precomputed solution table if it was built (python solution.py)
+if os.path.exists("solution.bin"):
+    ttt.load_solution("solution.bin")
+
 user = None
 board = ttt.initial_state()
 ai_turn = False
@@ -113,7 +118,6 @@ while True:
         # Check for AI move
         if user != player and not game_over:
             if ai_turn:
-                time.sleep(0.5)
                 if difficulty == "hard":
                     move = ttt.minimax(board)
                 else:
@@ -0,0 +1,223 @@
+"""
+Headless tic tac toe arena : plays many games between two AIs over a process pool,
+and reports results, nodes searched and move latency.
+
+Usage: python selfplay.py ENGINE1 ENGINE2 [-n GAMES] [-w WORKERS] [--cold] [--csv FILE] [--json FILE]
+Engines: minimax, random, table (needs --solution), mnk
+"""
+
+import argparse
+import csv
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import mnk
+import tictactoe as ttt
+from stats import percentile
+
+
+def search_engine(board):
+    """
+    ttt.minimax, searching even when a solution table is loaded for the table engine.
+    """
+    table, ttt.solution = ttt.solution, None
+    try:
+        return ttt.minimax(board)
+    finally:
+        ttt.solution = table
+
+
+def table_engine(board):
+    """
+    Optimal move read from the loaded solution table.
+    """
+    return ttt.solution_move(board)
+
+
+def mnk_engine(board):
+    """
+    mnk.minimax on a 3,3,3 board, replaying the stones of the tictactoe board.
+    """
+    board = ttt.to_list(board)
+    xstones = [(i, j) for i in range(3) for j in range(3) if board[i][j] == ttt.X]
+    ostones = [(i, j) for i in range(3) for j in range(3) if board[i][j] == ttt.O]
+    game = mnk.initial_state()
+    for k in range(len(xstones) + len(ostones)):
+        i, j = xstones[k // 2] if k % 2 == 0 else ostones[k // 2]
+        game.play(i * 3 + j)
+    return mnk.minimax(game, budget=1.0)
+
+
+# every engine takes a board and returns an action (i, j)
+ENGINES = {
+    "minimax": search_engine,
+    "random": ttt.randomIA,
+    "table": table_engine,
+    "mnk": mnk_engine
+}
+
+
+def play_games(engines, first, count, seed, solution, cold=False):
+    """
+    Play `count` games between the two `engines` names, starting with game number `first`.
+    Engines swap sides every game : on even games engines[0] plays X.
+    If `cold` is True, the transposition table and move ordering are cleared before every move,
+    so that each search starts from scratch instead of reusing the previous ones.
+    Returns a dict with one record per game, and the latencies and node counts of every move
+    of each engine.
+    """
+    random.seed(seed + first)
+    if solution is not None:
+        ttt.load_solution(solution)
+
+    games = []
+    latencies = {name: [] for name in engines}
+    nodes = {name: [] for name in engines}
+
+    for number in range(first, first + count):
+        x, o = engines if number % 2 == 0 else engines[::-1]
+        board = ttt.initial_state(bitboard=True)
+        moves = []
+        while not ttt.terminal(board):
+            name = x if ttt.player(board) == ttt.X else o
+            if cold:
+                ttt.table.clear()
+                ttt.ordering.clear()
+            # each search engine only advances its own node counter
+            searched = ttt.ordering.nodes + mnk.nodes
+            start = time.perf_counter()
+            action = ENGINES[name](board)
+            latencies[name].append(time.perf_counter() - start)
+            nodes[name].append(ttt.ordering.nodes + mnk.nodes - searched)
+            board = ttt.result(board, action)
+            moves.append(action)
+
+        games.append({
+            "game": number,
+            "x": x,
+            "o": o,
+            "winner": ttt.winner(board),
+            "moves": " ".join(f"{i}{j}" for i, j in moves)
+        })
+
+    return {"games": games, "latencies": latencies, "nodes": nodes}
+
+
+def summarize(engines, games, latencies, nodes):
+    """
+    Returns the summary of a match : win/draw/loss rates of engines[0], and move statistics of each engine.
+    """
+    wins = draws = losses = xwins = 0
+    for game in games:
+        if game["winner"] == ttt.X:
+            xwins += 1
+        if game["winner"] is None:
+            draws += 1
+        elif (game["x"] if game["winner"] == ttt.X else game["o"]) == engines[0]:
+            wins += 1
+        else:
+            losses += 1
+    total = len(games)
+
+    summary = {
+        "engines": list(engines),
+        "games": total,
+        "wins": wins,
+        "draws": draws,
+        "losses": losses,
+        "win_rate": wins / total if total else None,
+        "draw_rate": draws / total if total else None,
+        "loss_rate": losses / total if total else None,
+        "x_win_rate": xwins / total if total else None,
+        "moves": dict()
+    }
+    for name in engines:
+        times = sorted(latencies[name])
+        summary["moves"][name] = {
+            "moves": len(times),
+            "nodes_per_move": sum(nodes[name]) / len(times) if times else 0,
+            "latency_p50_ms": percentile(times, 50) * 1000 if times else None,
+            "latency_p90_ms": percentile(times, 90) * 1000 if times else None,
+            "latency_p99_ms": percentile(times, 99) * 1000 if times else None,
+            "latency_max_ms": times[-1] * 1000 if times else None
+        }
+    return summary
+
+
+def match(engines, n, workers, seed=0, solution=None, chunk=1000, cold=False):
+    """
+    Play `n` games between the two engines over `workers` processes, searching cold if `cold`
+    is True (see play_games).
+    Returns the list of game records and the summary of the match, which records the mode.
+    """
+    games = []
+    latencies = {name: [] for name in engines}
+    nodes = {name: [] for name in engines}
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(play_games, engines, first, min(chunk, n - first), seed, solution, cold)
+            for first in range(0, n, chunk)
+        ]
+        for future in futures:
+            done = future.result()
+            games.extend(done["games"])
+            for name in engines:
+                latencies[name].extend(done["latencies"][name])
+                nodes[name].extend(done["nodes"][name])
+
+    summary = summarize(engines, games, latencies, nodes)
+    summary["cold"] = cold
+    return games, summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play tic tac toe AIs against each other.")
+    parser.add_argument("engines", nargs=2, choices=sorted(ENGINES), help="the two engines to play")
+    parser.add_argument("-n", "--games", type=int, default=1000, help="number of games (default 1000)")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--cold", action="store_true",
+                        help="clear the transposition table and move ordering before every move")
+    parser.add_argument("--solution", help="solution table for the table engine (see solution.py)")
+    parser.add_argument("--csv", help="write one line per game to this file")
+    parser.add_argument("--json", help="write the summary to this file")
+    args = parser.parse_args()
+
+    if "table" in args.engines and args.solution is None:
+        parser.error("the table engine needs --solution")
+
+    start = time.perf_counter()
+    games, summary = match(args.engines, args.games, args.workers, args.seed, args.solution, cold=args.cold)
+    elapsed = time.perf_counter() - start
+    summary["seconds"] = elapsed
+
+    # print result
+    first, second = args.engines
+    print(f"{summary['games']} games in {elapsed:.1f} s ({summary['games'] / elapsed:.0f} games/s), "
+          f"{'cold' if args.cold else 'warm'} searches")
+    if summary["games"]:
+        print(f"{first} vs {second}: "
+              f"{summary['win_rate']:.1%} wins, {summary['draw_rate']:.1%} draws, {summary['loss_rate']:.1%} losses")
+    for name, stats in summary["moves"].items():
+        if stats["moves"] == 0:
+            continue
+        print(f"{name}: {stats['moves']} moves, {stats['nodes_per_move']:.1f} nodes/move, "
+              f"latency p50 {stats['latency_p50_ms']:.3f} ms, p90 {stats['latency_p90_ms']:.3f} ms, "
+              f"p99 {stats['latency_p99_ms']:.3f} ms")
+
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=["game", "x", "o", "winner", "moves"])
+            writer.writeheader()
+            writer.writerows(games)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Tic tac toe move server : answers "what should I play on this board" requests from many
+players at once, over a local socket (one JSON object per line) or in-process.
+
+Request:  {"board": [["X", null, null], [null, "O", null], [null, null, null]]}
+Answer:   {"move": [0, 2]}  (null if the game is over), or {"error": "..."}
+Request:  {"stats": true}  answers the server counters.
+
+Usage: python server.py [port]
+"""
+
+import asyncio
+import json
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import tictactoe as ttt
+from stats import percentile
+
+
+def search(board):
+    """
+    Runs in a worker process : returns the optimal action for the board.
+    """
+    return ttt.minimax(board)
+
+
+def check_board(board):
+    """
+    Returns the board as a Bitboard, raising ValueError if it isn't a valid tic tac toe board.
+    """
+    if not (isinstance(board, list) and len(board) == 3
+            and all(isinstance(row, list) and len(row) == 3 for row in board)):
+        raise ValueError("board must be a list of 3 rows of 3 cells")
+    if any(cell not in (ttt.X, ttt.O, ttt.EMPTY) for row in board for cell in row):
+        raise ValueError("cells must be \"X\", \"O\" or null")
+
+    bitboard = ttt.to_bitboard(board)
+    if bitboard.x.bit_count() - bitboard.o.bit_count() not in (0, 1):
+        raise ValueError("board can't be reached : wrong number of X and O")
+    return bitboard
+
+
+class MoveServer():
+
+    def __init__(self, workers=None, window=10000):
+        """
+        Initialize a server searching moves with `workers` processes.
+        Moves already found are kept in `cache`, and searches still running in `pending`
+        (both keyed by the board encoding), so a board is only ever searched once.
+        Latencies of the last `window` requests are kept for the percentiles.
+        """
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+        self.cache = dict()
+        self.pending = dict()
+        self.latencies = deque(maxlen=window)
+        self.started = time.perf_counter()
+
+        # counters
+        self.requests = 0
+        self.cache_hits = 0
+        self.deduplicated = 0
+        self.searches = 0
+        self.errors = 0
+
+    async def move(self, board):
+        """
+        Returns the optimal action for the board (a nested list or a Bitboard).
+        Rejected boards count in the latencies too.
+        """
+        start = time.perf_counter()
+        self.requests += 1
+        try:
+            if not isinstance(board, ttt.Bitboard):
+                board = check_board(board)
+            key = ttt.encode(board)
+
+            # answered before : no need to wait for anything
+            if key in self.cache:
+                self.cache_hits += 1
+                return self.cache[key]
+
+            # being searched for another player : wait for the same result
+            future = self.pending.get(key)
+            if future is not None:
+                self.deduplicated += 1
+            else:
+                self.searches += 1
+                future = asyncio.get_running_loop().run_in_executor(self.executor, search, board)
+                self.pending[key] = future
+                future.add_done_callback(lambda done: self.finish(key, done))
+
+            # shield, so a player leaving doesn't cancel the search the others wait for
+            return await asyncio.shield(future)
+        finally:
+            self.latencies.append(time.perf_counter() - start)
+
+    def finish(self, key, future):
+        """
+        Called when the search of `key` is over : cache its result.
+        """
+        del self.pending[key]
+        if not future.cancelled() and future.exception() is None:
+            self.cache[key] = future.result()
+
+    def stats(self):
+        """
+        Returns the server counters, with the throughput since start and latency percentiles
+        over the last requests.
+        """
+        elapsed = time.perf_counter() - self.started
+        latencies = [latency * 1000 for latency in sorted(self.latencies)]
+
+        return {
+            "requests": self.requests,
+            "cache_hits": self.cache_hits,
+            "deduplicated": self.deduplicated,
+            "searches": self.searches,
+            "errors": self.errors,
+            "cached_positions": len(self.cache),
+            "throughput": self.requests / elapsed if elapsed else 0,
+            "latency_p50_ms": percentile(latencies, 50),
+            "latency_p99_ms": percentile(latencies, 99)
+        }
+
+    async def answer(self, line):
+        """
+        Returns the answer (a dict) to one request line.
+        """
+        try:
+            request = json.loads(line)
+            if request.get("stats"):
+                return self.stats()
+            move = await self.move(request["board"])
+            return {"move": list(move) if move is not None else None}
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            self.errors += 1
+            return {"error": str(e) or type(e).__name__}
+
+    async def handle(self, reader, writer):
+        """
+        Serve one connection : one request per line, answered in order.
+        """
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                answer = await self.answer(line)
+                writer.write(json.dumps(answer).encode() + b"\n")
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8765):
+        """
+        Listen for players on `host`:`port` until cancelled.
+        """
+        server = await asyncio.start_server(self.handle, host, port)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        """
+        Stop the worker processes.
+        """
+        self.executor.shutdown()
+
+
+def main():
+    if len(sys.argv) > 2:
+        sys.exit("Usage: python server.py [port]")
+    port = int(sys.argv[1]) if len(sys.argv) == 2 else 8765
+
+    server = MoveServer()
+    print(f"Serving tic tac toe moves on 127.0.0.1:{port}")
+    try:
+        asyncio.run(server.serve(port=port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
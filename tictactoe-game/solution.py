@@ -0,0 +1,83 @@
+"""
+Builds the tic tac toe solution table : every reachable position is solved once,
+and the value and optimal moves are written to a file minimax can load at startup.
+
+Usage: python solution.py [filename]
+"""
+
+import os
+import sys
+import time
+
+import tictactoe as ttt
+
+
+def solve(board, entries):
+    """
+    Solve `board` (a Bitboard) and every position reachable from it, filling `entries`
+    (indexed by base 3 encoding). Returns the utility of `board` with optimal play.
+    """
+    index = ttt.encode(board)
+
+    # already solved from another move order
+    if entries[index] & ttt.REACHABLE:
+        return ((entries[index] >> 9) & 0b11) - 1
+
+    if ttt.terminal(board):
+        value = ttt.utility(board)
+        moves = 0
+    else:
+        # value of every move, then keep the best one(s) for the current player
+        values = dict()
+        for action in ttt.actions(board):
+            values[action] = solve(ttt.result(board, action), entries)
+        if ttt.player(board) == ttt.X:
+            value = max(values.values())
+        else:
+            value = min(values.values())
+
+        moves = 0
+        for (i, j), v in values.items():
+            if v == value:
+                moves |= 1 << (3 * i + j)
+
+    entries[index] = ttt.REACHABLE | ((value + 1) << 9) | moves
+    return value
+
+
+def build():
+    """
+    Returns the solution table of the whole game, a list of ttt.SOLUTION_SIZE entries.
+    """
+    entries = [0] * ttt.SOLUTION_SIZE
+    solve(ttt.initial_state(bitboard=True), entries)
+    return entries
+
+
+def main():
+    if len(sys.argv) > 2:
+        sys.exit("Usage: python solution.py [filename]")
+    filename = sys.argv[1] if len(sys.argv) == 2 else "solution.bin"
+
+    # build the table
+    start = time.perf_counter()
+    entries = build()
+    built = time.perf_counter() - start
+    positions = sum(1 for entry in entries if entry & ttt.REACHABLE)
+    print(f"Solved {positions} reachable positions in {built * 1000:.1f} ms.")
+
+    ttt.save_solution(entries, filename)
+    print(f"Wrote {filename} ({os.path.getsize(filename)} bytes).")
+
+    # time what the runner pays at startup
+    start = time.perf_counter()
+    ttt.load_solution(filename)
+    loaded = time.perf_counter() - start
+    print(f"Loaded {filename} in {loaded * 1000:.2f} ms.")
+
+    board = ttt.initial_state()
+    print(f"Value of the game: {ttt.solution_value(board)}, first move: {ttt.minimax(board)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+"""
+Statistics shared by the self-play arena and the move server.
+"""
+
+import math
+
+
+def percentile(values, p):
+    """
+    Returns the `p`th percentile of a sorted list of values (nearest rank).
+    """
+    if not values:
+        return None
+    rank = max(1, math.ceil(p / 100 * len(values)))
+    return values[rank - 1]
@@ -5,29 +5,88 @@ Tic Tac Toe Player
 import math
 import copy
 import random
+import sys
+from array import array
+from collections import namedtuple
 
 X = "X"
 O = "O"
 EMPTY = None
 
+# alternative board backend : two 9-bit integers, one for X and one for O.
+# cell (i, j) is bit number 3 * i + j of the mask of the player who played it.
+Bitboard = namedtuple("Bitboard", ["x", "o"])
+
+# mask of a full board (every cell taken)
+FULL = 0b111111111
+
+# precomputed masks of the 8 winning lines (3 rows, 3 cols, 2 diagonals)
+WIN_MASKS = (
+    0b000000111, 0b000111000, 0b111000000,
+    0b001001001, 0b010010010, 0b100100100,
+    0b100010001, 0b001010100
+)
+
 # basic custom exception
 class InvalidAction(Exception):
     pass
 
 
-def initial_state():
+def initial_state(bitboard=False):
     """
     Returns starting state of the board.
+    If `bitboard` is True, the board is returned as a Bitboard instead of a nested list.
     """
+    if bitboard:
+        return Bitboard(0, 0)
     return [[EMPTY, EMPTY, EMPTY],
             [EMPTY, EMPTY, EMPTY],
             [EMPTY, EMPTY, EMPTY]]
 
 
+def to_bitboard(board):
+    """
+    Returns the Bitboard equivalent of a board (given as a nested list or a Bitboard).
+    """
+    if isinstance(board, Bitboard):
+        return board
+
+    x = 0
+    o = 0
+    for row in range(3):
+        for col in range(3):
+            if board[row][col] == X:
+                x |= 1 << (3 * row + col)
+            elif board[row][col] == O:
+                o |= 1 << (3 * row + col)
+    return Bitboard(x, o)
+
+
+def to_list(board):
+    """
+    Returns the nested list equivalent of a board (given as a nested list or a Bitboard).
+    """
+    if not isinstance(board, Bitboard):
+        return board
+
+    newboard = initial_state()
+    for row in range(3):
+        for col in range(3):
+            bit = 1 << (3 * row + col)
+            if board.x & bit:
+                newboard[row][col] = X
+            elif board.o & bit:
+                newboard[row][col] = O
+    return newboard
+
+
 def player(board):
     """
     Returns player who has the next turn on a board.
     """
+    if isinstance(board, Bitboard):
+        return bitboard_player(board)
+
     countx = 0
     counto = 0
 
@@ -54,6 +113,9 @@ def actions(board):
     """
     Returns set of all possible actions (i, j) available on the board.
     """
+    if isinstance(board, Bitboard):
+        return bitboard_actions(board)
+
     actions = set()
 
     # iterate through each cell to see if it's empty or not.
@@ -70,7 +132,11 @@ def actions(board):
 def result(board, action):
     """
     Returns the board that results from making move (i, j) on the board.
+    The new board uses the same representation as `board`.
     """
+    if isinstance(board, Bitboard):
+        return bitboard_result(board, action)
+
     # find out current player turn 
     currentplayer = player(board)
 
@@ -90,6 +156,9 @@ def winner(board):
     """
     Returns the winner of the game, if there is one.
     """
+    if isinstance(board, Bitboard):
+        return bitboard_winner(board)
+
     boardValues = [[0, 0, 0], [0, 0, 0], [0, 0, 0]]
     # assign values for each cell.
     for row in range(3):
@@ -143,6 +212,9 @@ def terminal(board):
     """
     Returns True if game is over, False otherwise.
     """
+    if isinstance(board, Bitboard):
+        return bitboard_terminal(board)
+
     # check the board for empty
     emptyCount = 0
     for row in range(3):
@@ -189,6 +261,16 @@ def minimax(board):
         
     # else return the optimal move
     else:
+        # if a solution table is loaded, the best move is just a lookup
+        if solution is not None:
+            move = solution_move(board)
+            if move is not None:
+                return move
+
+        # search on the bitboard backend, it is a lot cheaper than copying nested lists.
+        # the returned action (i, j) is the same for both representations.
+        board = to_bitboard(board)
+
         # find who's turn it is (who's the ia is).
         iaplayer = player(board)
         if iaplayer == "X":
@@ -202,40 +284,39 @@ def minimax(board):
         # alpha beta pruning
         # alpha keeps track of the maximum score X player can have, and beta the minimum score O can have. 
         # by comparing the two of them, we can not search useless branches
-        #initially, alpha = -math.inf, beta = math.inf. (declared in the for loop)  
+        # the window is shared between the root moves : once a move is known to reach some score,
+        # the next moves only have to prove they do better.
+        alpha = -math.inf
+        beta = math.inf
 
         # if ia is X
         if ismax:
-            # array to stock the moves and their utility to chose the best one
-            movesarr = []
-            # iterate through every immediate action to know which one is the best
-            for action in actions(board):
+            bestValue = -math.inf
+            # iterate through every immediate action (best looking first) to know which one is the best
+            for action in ordering.order(board, 0):
                 # call minvalue to guess what the opponent next move is gonna be. (here opponent is O, so they aim to minimize.) 
                 # (then recursively play games until game over)
-                # append the moves and their utility to the array to sort them by their utility later.
-                movesarr.append((Minalphabeta(result(board, action), -math.inf, math.inf), action))
-
-            #select best move (of one of them) by organizing them by utility value (descendant to have the biggest first)
-            movesarr.sort(key=lambda tuple: tuple[0], reverse=True)
-            # select the first one of the array (biggest utility) and return the corresponding move.
-            bestMove = movesarr[0][1]
+                value = Minalphabeta(result(board, action), alpha, beta, 1)
+                # keep the first move with the biggest utility
+                if value > bestValue:
+                    bestValue = value
+                    bestMove = action
+                alpha = max(alpha, value)
             return bestMove
 
         # if ia is O
         else:
-            # array to stock the moves and their utility to chose the best one
-            movesarr = []
-            # iterate through every immediate action to know which one is the best
-            for action in actions(board):
+            bestValue = math.inf
+            # iterate through every immediate action (best looking first) to know which one is the best
+            for action in ordering.order(board, 0):
                 # call maxvalue to guess what the opponent next move is gonna be. (here opponent is X, so they aim to maximize.) 
                 # (then recursively play games until game over)
-                # append the moves and their utility to the array to sort them by their utility later.
-                movesarr.append((Maxalphabeta(result(board, action), -math.inf, math.inf), action))
-
-            #select best move (of one of them) by organizing them by utility value (ascendant to have the smallest first)
-            movesarr.sort(key=lambda tuple: tuple[0])
-            # select the first one of the array (smallest utility) and return the corresponding move.
-            bestMove = movesarr[0][1]
+                value = Maxalphabeta(result(board, action), alpha, beta, 1)
+                # keep the first move with the smallest utility
+                if value < bestValue:
+                    bestValue = value
+                    bestMove = action
+                beta = min(beta, value)
             return bestMove
 
 
@@ -279,7 +360,11 @@ def Minvalue(board):
 
 
 # ALPHA BETA PRUNING (ameliored minimax, replace Minvalue and Maxvalue functions)
-def Minalphabeta(board, alpha, beta):
+# both functions share the transposition table, so a position reached from different move orders
+# (or a rotated / mirrored version of it) is only searched once.
+def Minalphabeta(board, alpha, beta, ply=0):
+    ordering.nodes += 1
+
     # can only do better than this
     val = math.inf
 
@@ -288,22 +373,42 @@ def Minalphabeta(board, alpha, beta):
         # ping pong between minvalue and maxvalue, every time the player change, until terminal(board)
         util = utility(board)
         return util
+
+    # if this position was already searched, use what we know about it
+    key = canonical(board)
+    entry = table.lookup(key)
+    alphaorig, betaorig = alpha, beta
+    if entry is not None:
+        value, flag = entry
+        if flag == TranspositionTable.EXACT:
+            return value
+        elif flag == TranspositionTable.LOWER:
+            alpha = max(alpha, value)
+        else:
+            beta = min(beta, value)
+        if beta <= alpha:
+            return value
     
-    # recursively find outputs for every actions possible everytime a new cell is played
-    for action in actions(board):
-        val = min(val, Maxalphabeta(result(board, action), alpha, beta))   
+    # recursively find outputs for every actions possible everytime a new cell is played (best looking first)
+    for action in ordering.order(board, ply):
+        val = min(val, Maxalphabeta(result(board, action), alpha, beta, ply + 1))   
         # alpha beta pruning : if there already is a better move, dont bother searching. 
         #  meaning here, if the o player score become less than what the x player is assured of,
         # we doesnt need to keep going, since the x player would optimally choose the better choice for them (biggest). 
         beta = min(beta, val)
         if beta <= alpha:
-            return val 
+            ordering.cutoff(board, action, ply)
+            break
+
+    table.store(key, val, alphaorig, betaorig)
 
      # return smallest utility of the branch
     return val
 
 
-def Maxalphabeta(board, alpha, beta):
+def Maxalphabeta(board, alpha, beta, ply=0):
+    ordering.nodes += 1
+
     # can only do better than this
     val = -math.inf
 
@@ -311,24 +416,357 @@ def Maxalphabeta(board, alpha, beta):
     if terminal(board):
         util = utility(board)
         return util
+
+    # if this position was already searched, use what we know about it
+    key = canonical(board)
+    entry = table.lookup(key)
+    alphaorig, betaorig = alpha, beta
+    if entry is not None:
+        value, flag = entry
+        if flag == TranspositionTable.EXACT:
+            return value
+        elif flag == TranspositionTable.LOWER:
+            alpha = max(alpha, value)
+        else:
+            beta = min(beta, value)
+        if beta <= alpha:
+            return value
     
-    # recursively find outputs for every actions
-    for action in actions(board):
+    # recursively find outputs for every actions (best looking first)
+    for action in ordering.order(board, ply):
         # ping pong between minvalue and maxvalue, every time the player change, until terminal(board)
-        val = max(val, Minalphabeta(result(board, action), alpha, beta))   
+        val = max(val, Minalphabeta(result(board, action), alpha, beta, ply + 1))   
 
         # alpha beta pruning : if there already is a better move, dont bother searching. 
         #  meaning here, if the x player score become more than what the O player is assured of,
         # we doesnt need to keep going, since the O player would optimally choose the better choice for them (lowest). 
         alpha = max(alpha, val)
         if beta <= alpha:
-            return val
+            ordering.cutoff(board, action, ply)
+            break
+
+    table.store(key, val, alphaorig, betaorig)
 
     # return biggest utility of the branch
     return val
 
 
 
+# TRANSPOSITION TABLE
+def symmetry(transform):
+    """
+    Returns a table mapping every 9-bit mask to its image under `transform`,
+    a function that moves cell (i, j) to another cell (i, j).
+    """
+    images = []
+    for mask in range(FULL + 1):
+        image = 0
+        for cell in range(9):
+            if mask & (1 << cell):
+                i, j = transform(*divmod(cell, 3))
+                image |= 1 << (3 * i + j)
+        images.append(image)
+    return images
+
+
+# the 8 rotations / reflections of the board, precomputed for every possible mask
+SYMMETRIES = [symmetry(transform) for transform in (
+    lambda i, j: (i, j),
+    lambda i, j: (j, 2 - i),
+    lambda i, j: (2 - i, 2 - j),
+    lambda i, j: (2 - j, i),
+    lambda i, j: (i, 2 - j),
+    lambda i, j: (2 - i, j),
+    lambda i, j: (j, i),
+    lambda i, j: (2 - j, 2 - i)
+)]
+
+
+def canonical(board):
+    """
+    Returns an integer key identifying the board up to rotations and reflections,
+    so all 8 symmetric versions of a position share the same key.
+    """
+    board = to_bitboard(board)
+    return min(images[board.x] | (images[board.o] << 9) for images in SYMMETRIES)
+
+
+class TranspositionTable():
+
+    # kind of value stored for a position
+    EXACT = 0
+    LOWER = 1
+    UPPER = 2
+
+    def __init__(self):
+        """
+        Initialize an empty table.
+        Each entry maps a canonical key to a `(value, flag)` pair, where `flag` tells if
+        `value` is the exact minimax value of the position, or only a lower / upper bound of it.
+        """
+        self.entries = dict()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, key):
+        """
+        Returns the `(value, flag)` pair stored for `key`, or None if the position is unknown.
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def store(self, key, value, alpha, beta):
+        """
+        Store the value found for `key` by a search with the window (`alpha`, `beta`).
+        A value outside of the window is only a bound of the real value.
+        """
+        if value <= alpha:
+            flag = TranspositionTable.UPPER
+        elif value >= beta:
+            flag = TranspositionTable.LOWER
+        else:
+            flag = TranspositionTable.EXACT
+        self.entries[key] = (value, flag)
+
+    def clear(self):
+        """
+        Forget every stored position and reset the counters.
+        """
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+# table shared by every search
+table = TranspositionTable()
+
+
+
+# BITBOARD BACKEND (same rules as above, but each function is a few integer operations)
+def bitboard_player(board):
+    """
+    Returns player who has the next turn on a Bitboard.
+    """
+    # X always starts, so O plays when X has one more stone
+    if board.x.bit_count() > board.o.bit_count():
+        return O
+    return X
+
+
+def bitboard_actions(board):
+    """
+    Returns set of all possible actions (i, j) available on a Bitboard.
+    """
+    actions = set()
+    free = FULL & ~(board.x | board.o)
+    while free:
+        # take the lowest free cell and clear it
+        bit = free & -free
+        free ^= bit
+        actions.add(divmod(bit.bit_length() - 1, 3))
+    return actions
+
+
+def bitboard_result(board, action):
+    """
+    Returns the Bitboard that results from making move (i, j) on a Bitboard.
+    """
+    bit = 1 << (3 * action[0] + action[1])
+    if (board.x | board.o) & bit:
+        raise InvalidAction('Action is not valid')
+
+    if bitboard_player(board) == X:
+        return Bitboard(board.x | bit, board.o)
+    return Bitboard(board.x, board.o | bit)
+
+
+def bitboard_winner(board):
+    """
+    Returns the winner of the game on a Bitboard, if there is one.
+    """
+    for mask in WIN_MASKS:
+        if board.x & mask == mask:
+            return X
+        if board.o & mask == mask:
+            return O
+    return None
+
+
+def bitboard_terminal(board):
+    """
+    Returns True if game is over on a Bitboard, False otherwise.
+    """
+    return (board.x | board.o) == FULL or bitboard_winner(board) is not None
+
+
+
+# MOVE ORDERING
+# alpha beta prunes the most when the best move is searched first, so moves are not taken
+# in the (random) order of the actions set : center first, then corners, then edges.
+STATIC_ORDER = ((1, 1), (0, 0), (0, 2), (2, 0), (2, 2), (0, 1), (1, 0), (1, 2), (2, 1))
+
+# rank of each cell in the static order : 0 for the center, 1 for corners, 2 for edges
+RANK = {action: 0 if k == 0 else 1 if k <= 4 else 2 for k, action in enumerate(STATIC_ORDER)}
+
+
+class MoveOrdering():
+
+    # available orderings
+    NONE = "none"
+    STATIC = "static"
+    HEURISTIC = "heuristic"
+
+    def __init__(self, mode="heuristic"):
+        """
+        Initialize a move ordering.
+        `mode` is one of :
+            - "none" : moves in the order of actions(board)
+            - "static" : center, corners, then edges
+            - "heuristic" : killer moves, then center, corners and edges, each by history score
+        Killer moves are the last moves that caused a cutoff at a given ply, and the history
+        score of a move grows every time it causes a cutoff, the more so the higher in the tree.
+        `nodes` counts the positions searched, to compare orderings.
+        """
+        self.mode = mode
+        self.killers = dict()
+        self.history = dict()
+        self.nodes = 0
+
+    def order(self, board, ply):
+        """
+        Returns the list of actions available on the board, in the order they should be searched.
+        """
+        moves = actions(board)
+        if self.mode == MoveOrdering.NONE:
+            return list(moves)
+
+        ordered = [action for action in STATIC_ORDER if action in moves]
+        if self.mode == MoveOrdering.STATIC:
+            return ordered
+
+        # history only reorders cells of the same kind, sort is stable so ties keep the static order
+        ordered.sort(key=lambda action: (RANK[action], -self.history.get(action, 0)))
+        killers = [action for action in self.killers.get(ply, []) if action in moves]
+        return killers + [action for action in ordered if action not in killers]
+
+    def cutoff(self, board, action, ply):
+        """
+        Remember that `action` caused a cutoff at `ply` on the board.
+        """
+        if self.mode != MoveOrdering.HEURISTIC:
+            return
+
+        # keep the 2 most recent killers of each ply
+        killers = self.killers.setdefault(ply, [])
+        if action not in killers:
+            killers.insert(0, action)
+            del killers[2:]
+
+        # a cutoff near the root saves more work than one near the leaves
+        depth = len(actions(board))
+        self.history[action] = self.history.get(action, 0) + depth * depth
+
+    def clear(self):
+        """
+        Forget the killers and history, and reset the node counter.
+        """
+        self.killers.clear()
+        self.history.clear()
+        self.nodes = 0
+
+
+# ordering used by every search
+ordering = MoveOrdering()
+
+
+
+# SOLUTION TABLE (built once with solution.py, then loaded with load_solution)
+# every position is encoded in base 3 (empty = 0, X = 1, O = 2, cell k having weight 3 ** k),
+# and the table stores one 16 bits entry per encoding :
+#   bit 15 : the position is reachable (and so the entry is valid)
+#   bits 9-10 : utility of the position with optimal play, plus 1
+#   bits 0-8 : mask of every optimal move
+SOLUTION_MAGIC = b"TTT1"
+SOLUTION_SIZE = 3 ** 9
+REACHABLE = 1 << 15
+
+# base 3 weight of every mask, so a bitboard is encoded with two lookups
+BASE3 = [sum(3 ** cell for cell in range(9) if mask & (1 << cell)) for mask in range(FULL + 1)]
+
+# the loaded table, None while no table is loaded
+solution = None
+
+
+def encode(board):
+    """
+    Returns the base 3 encoding of a board, its index in the solution table.
+    """
+    board = to_bitboard(board)
+    return BASE3[board.x] + 2 * BASE3[board.o]
+
+
+def save_solution(entries, filename):
+    """
+    Write a solution table (an array of SOLUTION_SIZE 16 bits entries) to `filename`.
+    Entries are always written little-endian.
+    """
+    entries = array("H", entries)
+    if sys.byteorder == "big":
+        entries.byteswap()
+    with open(filename, "wb") as f:
+        f.write(SOLUTION_MAGIC)
+        entries.tofile(f)
+
+
+def load_solution(filename):
+    """
+    Load a solution table written by save_solution. Once loaded, minimax only does a lookup.
+    """
+    global solution
+
+    entries = array("H")
+    with open(filename, "rb") as f:
+        if f.read(len(SOLUTION_MAGIC)) != SOLUTION_MAGIC:
+            raise ValueError(f"{filename} is not a tic tac toe solution table")
+        entries.fromfile(f, SOLUTION_SIZE)
+    if sys.byteorder == "big":
+        entries.byteswap()
+    solution = entries
+
+
+def solution_move(board):
+    """
+    Returns an optimal action (i, j) for the board from the loaded solution table,
+    or None if the position is not in the table.
+    """
+    entry = solution[encode(board)]
+    if not entry & REACHABLE:
+        return None
+
+    moves = entry & FULL
+    if moves == 0:
+        return None
+    # take the lowest optimal move, so the choice is always the same
+    bit = moves & -moves
+    return divmod(bit.bit_length() - 1, 3)
+
+
+def solution_value(board):
+    """
+    Returns the utility of the board with optimal play from the loaded solution table,
+    or None if the position is not in the table.
+    """
+    entry = solution[encode(board)]
+    if not entry & REACHABLE:
+        return None
+    return ((entry >> 9) & 0b11) - 1
+
+
+
 # don't mind this, it's a ia who choose a random move, for testing purposes
 def randomIA(board):
     # if board is terminal return none